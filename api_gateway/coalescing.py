@@ -0,0 +1,92 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class UpstreamResponse:
+    content: bytes
+    status_code: int
+    headers: Dict[str, str]
+
+
+@dataclass
+class _Call:
+    future: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Deduplica chamadas idênticas em andamento: uma vai ao upstream, as demais aguardam o resultado"""
+
+    def __init__(self, max_waiters: int = 100, max_response_bytes: int = 1024 * 1024):
+        self.max_waiters = max_waiters
+        self.max_response_bytes = max_response_bytes
+        self.inflight: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.overflow = 0
+        self.oversized = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[UpstreamResponse]]) -> Tuple[UpstreamResponse, bool]:
+        """Executa fn (ou aguarda a chamada em andamento) e indica se o resultado foi compartilhado"""
+        call = self.inflight.get(key)
+        if call is not None:
+            if call.waiters >= self.max_waiters:
+                self.overflow += 1
+                return await fn(), False
+            call.waiters += 1
+            try:
+                result = await asyncio.shield(call.future)
+            except asyncio.CancelledError:
+                if not call.future.cancelled():
+                    raise
+                result = None  # o líder foi cancelado (cliente desconectou)
+            if result is None:
+                return await fn(), False
+            self.coalesced += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        # Evita o aviso de exceção não recuperada quando não há quem aguarde
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.inflight[key] = _Call(future=future)
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            # Respostas grandes não são retidas para os demais: cada um refaz a chamada
+            if len(result.content) > self.max_response_bytes:
+                self.oversized += 1
+                future.set_result(None)
+            else:
+                future.set_result(result)
+            return result, False
+        finally:
+            self.inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.coalesced
+        return {
+            "inflight": len(self.inflight),
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesce_rate": self.coalesced / total if total else 0.0,
+            "overflow": self.overflow,
+            "oversized": self.oversized
+        }
+
+
+def scope_for(mode: str, username: Optional[str], role: Optional[str]) -> str:
+    """Escopo de autorização incluído na chave ("user", "role" ou "none")"""
+    if mode == "user":
+        return f"user:{username or ''}"
+    if mode == "role":
+        return f"role:{role or ''}"
+    return ""
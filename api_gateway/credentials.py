@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+SCHEME = "scrypt"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    # Função de módulo para poder ser enviada a um ProcessPoolExecutor
+    return hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        dklen=dklen,
+        maxmem=256 * n * r + 1024 * 1024
+    )
+
+
+def _hash(password: str, n: int, r: int, p: int, dklen: int) -> str:
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p, dklen)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def _verify(password: str, stored: str) -> bool:
+    if stored.startswith(SCHEME + "$"):
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = _b64decode(digest)
+        candidate = _scrypt(password, _b64decode(salt), int(n), int(r), int(p), len(expected))
+        return hmac.compare_digest(candidate, expected)
+    # Formato legado: SHA256 sem salt em hexadecimal
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+
+
+class PasswordHasher:
+    """Hash de senhas com scrypt (salt e parâmetros ajustáveis) fora do event loop"""
+
+    def __init__(
+        self,
+        n: int = 2 ** 14,
+        r: int = 8,
+        p: int = 1,
+        dklen: int = 32,
+        workers: Optional[int] = None,
+        executor: str = "thread"
+    ):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.dklen = dklen
+        # Por padrão usa metade dos núcleos, deixando folga para o tráfego de proxy
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        # Criado sob demanda para não abrir threads/processos no import
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kdf")
+        return self._executor
+
+    def hash_sync(self, password: str) -> str:
+        return _hash(password, self.n, self.r, self.p, self.dklen)
+
+    def verify_sync(self, password: str, stored: str) -> bool:
+        return _verify(password, stored)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """Hashes legados ou com parâmetros antigos devem ser refeitos no próximo login"""
+        if not stored.startswith(SCHEME + "$"):
+            return True
+        _, n, r, p, _, digest = stored.split("$")
+        return (int(n), int(r), int(p), len(_b64decode(digest))) != (self.n, self.r, self.p, self.dklen)
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _hash, password, self.n, self.r, self.p, self.dklen)
+
+    async def verify(self, password: str, stored: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _verify, password, stored)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,242 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "EdDSA"}
+LOCK_FILE = ".lock"
+
+
+@dataclass
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Any
+    public_key: Any
+    created_at: float
+
+
+def generate_key(algorithm: str) -> SigningKey:
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Algoritmo não suportado: {algorithm}")
+    return SigningKey(
+        kid=uuid.uuid4().hex[:16],
+        algorithm=algorithm,
+        private_key=private_key,
+        public_key=private_key.public_key(),
+        created_at=time.time()
+    )
+
+
+def public_jwk(key: SigningKey) -> dict:
+    algorithm = RSAAlgorithm if key.algorithm == "RS256" else OKPAlgorithm
+    jwk = algorithm.to_jwk(key.public_key, as_dict=True)
+    jwk.update({"kid": key.kid, "alg": key.algorithm, "use": "sig"})
+    return jwk
+
+
+class KeyRing:
+    """Chaves de assinatura de JWT com kid e rotação periódica.
+
+    A chave mais nova assina; as anteriores continuam publicadas no JWKS
+    (e aceitas na verificação) por `retention` segundos, tempo suficiente
+    para os tokens emitidos com elas expirarem. As chaves assimétricas ficam
+    obrigatoriamente em arquivos PEM em `keys_dir`, compartilhado entre os
+    workers e réplicas do gateway e persistente entre reinícios; um diretório
+    só de leitura (secret montado) é usado como está, sem rotação local.
+    HS256 mantém o modo legado com segredo compartilhado, sem JWKS.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "RS256",
+        rotation_interval: float = 24 * 3600,
+        retention: float = 2 * 3600,
+        keys_dir: Optional[str] = None,
+        secret: Optional[str] = None,
+        reload_interval: float = 5.0
+    ):
+        if algorithm in ASYMMETRIC_ALGORITHMS and not keys_dir:
+            # Chave só na memória: some no reinício e não vale nos outros workers
+            raise ValueError(f"{algorithm} exige um diretório de chaves compartilhado (keys_dir)")
+        self.algorithm = algorithm
+        self.rotation_interval = rotation_interval
+        self.retention = retention
+        self.keys_dir = Path(keys_dir) if keys_dir else None
+        self.secret = secret
+        self.reload_interval = reload_interval
+        self.last_load = 0.0
+        self.keys: Dict[str, SigningKey] = {}
+        self.misses: "OrderedDict[str, float]" = OrderedDict()  # kid desconhecido -> última releitura
+        self.skipped: set = set()  # arquivos inválidos já avisados no log
+        self.lock = threading.Lock()
+        # A primeira chave é gerada no startup (rotate_if_due) ou, sem ele, no primeiro sign()
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def current(self) -> Optional[SigningKey]:
+        if not self.keys:
+            return None
+        return max(self.keys.values(), key=lambda k: k.created_at)
+
+    def rotate_if_due(self) -> bool:
+        """Gera uma nova chave se a atual passou do intervalo; descarta as expiradas"""
+        if not self.asymmetric:
+            return False
+        with self.lock:
+            self._load_from_dir()
+            if not self._writable():
+                # Chaves de um secret montado: a rotação é feita fora do gateway
+                if not self.keys:
+                    raise RuntimeError(f"Nenhuma chave de assinatura em {self.keys_dir}")
+                return False
+            with self._dir_lock():
+                # Outro worker pode ter gerado a chave enquanto este esperava o lock
+                self._load_from_dir()
+                now = time.time()
+                current = self.current()
+                rotated = False
+                if current is None or now - current.created_at >= self.rotation_interval:
+                    key = generate_key(self.algorithm)
+                    self.keys[key.kid] = key
+                    self._write(key)
+                    rotated = True
+                newest = self.current()
+                for kid, key in list(self.keys.items()):
+                    if key is not newest and now - key.created_at > self.rotation_interval + self.retention:
+                        del self.keys[kid]
+                        (self.keys_dir / f"{int(key.created_at)}-{kid}.pem").unlink(missing_ok=True)
+                return rotated
+
+    @contextmanager
+    def _dir_lock(self):
+        """Lock exclusivo entre processos: um só worker gera ou descarta chaves por vez"""
+        with open(self.keys_dir / LOCK_FILE, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _writable(self) -> bool:
+        if not self.keys_dir.exists():
+            # Cria o diretório se o pai permitir; senão falha aqui, no startup
+            self.keys_dir.mkdir(parents=True, exist_ok=True)
+        return os.access(self.keys_dir, os.W_OK)
+
+    def _reload(self):
+        """Relê o diretório no máximo uma vez a cada `reload_interval` (JWKS)"""
+        if time.monotonic() - self.last_load < self.reload_interval:
+            return
+        with self.lock:
+            if time.monotonic() - self.last_load >= self.reload_interval:
+                self._load_from_dir()
+
+    def _reload_for(self, kid: str):
+        """Relê o diretório na hora para um kid desconhecido; o mesmo kid só de novo
+        depois de `reload_interval`, para que um kid inventado não custe uma leitura
+        por requisição"""
+        now = time.monotonic()
+        with self.lock:
+            if kid in self.keys:
+                return
+            last = self.misses.get(kid)
+            if last is not None and now - last < self.reload_interval:
+                return
+            self.misses[kid] = now
+            self.misses.move_to_end(kid)
+            while len(self.misses) > 1000:
+                self.misses.popitem(last=False)
+            self._load_from_dir()
+            if kid in self.keys:
+                del self.misses[kid]
+
+    def _write(self, key: SigningKey):
+        pem = key.private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        path = self.keys_dir / f"{int(key.created_at)}-{key.kid}.pem"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(pem)
+        os.chmod(tmp, 0o600)
+        tmp.replace(path)
+
+    def _load_from_dir(self):
+        self.last_load = time.monotonic()
+        if not self.keys_dir.is_dir():
+            return
+        for path in self.keys_dir.glob("*.pem"):
+            created, _, kid = path.stem.partition("-")
+            if kid in self.keys or path.name in self.skipped:
+                continue
+            try:
+                created_at = float(created)
+                private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+            except (ValueError, TypeError, OSError) as e:
+                # Um arquivo estranho no volume não pode derrubar os logins
+                self.skipped.add(path.name)
+                logger.warning("Arquivo de chave ignorado %s: %s", path, e)
+                continue
+            if not kid:
+                self.skipped.add(path.name)
+                logger.warning("Arquivo de chave ignorado %s: nome sem kid", path)
+                continue
+            self.keys[kid] = SigningKey(
+                kid=kid,
+                algorithm=self.algorithm,
+                private_key=private_key,
+                public_key=private_key.public_key(),
+                created_at=created_at
+            )
+
+    def sign(self, payload: dict) -> str:
+        if not self.asymmetric:
+            return jwt.encode(payload, self.secret, algorithm=self.algorithm)
+        key = self.current()
+        if key is None:
+            self.rotate_if_due()
+            key = self.current()
+        return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def verify(self, token: str) -> dict:
+        """Valida assinatura e expiração; levanta jwt.InvalidTokenError se inválido"""
+        if not self.asymmetric:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None:
+            # Chave criada por outro worker depois da última leitura do diretório
+            self._reload_for(kid)
+            key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("kid desconhecido")
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        if self.asymmetric:
+            # Publica também as chaves geradas pelos outros workers
+            self._reload()
+        keys: List[dict] = [public_jwk(k) for k in self.keys.values()] if self.asymmetric else []
+        return {"keys": keys}
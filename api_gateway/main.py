@@ -1,21 +1,65 @@
-from fastapi import FastAPI, Request, HTTPException, Depends, status
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+# Primeiro import: cada bloco abaixo entra em slowest_imports do relatório de inicialização
+from startup import startup_report, readiness
 import os
-import requests
+import json
 from typing import Optional, Any
-from pydantic import BaseModel
-from starlette.responses import Response
-import jwt
 from datetime import datetime, timedelta
 import hashlib
+import asyncio
+from contextlib import asynccontextmanager
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+with startup_report.timed_import("fastapi"):
+    from fastapi import FastAPI, Request, HTTPException, Depends, status
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+    from pydantic import BaseModel
+    from starlette.responses import Response, StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+with startup_report.timed_import("httpx"):
+    import httpx
+with startup_report.timed_import("jwt"):
+    import jwt
+with startup_report.timed_import("structured_logging"):
+    from structured_logging import configure_logging, request_logger, logging_stats
+with startup_report.timed_import("jwt_keys"):
+    from jwt_keys import KeyRing
+with startup_report.timed_import("modulos do gateway"):
+    from response_cache import ResponseCache, to_response, is_success
+    from coalescing import SingleFlight, UpstreamResponse, scope_for
+    from credentials import PasswordHasher
+    from user_store import MemoryUserStore, SQLUserStore, CachedUserStore
+    from rate_limit import RateLimiter, MemoryBucketStore, RedisBucketStore, ConcurrencyLimiter, parse_limits, retry_after
+    from tracing import tracer_from_env, TRACEPARENT
+    from upstream import forward_headers, response_headers, relay
+
+# Configurar logging (JSON em fila, gravado por uma thread)
+configure_logging("api-gateway")
 logger = logging.getLogger(__name__)
+# Logs por requisição, amostrados por LOG_REQUEST_SAMPLE_RATE
+request_log = request_logger("api_gateway.requests")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Chave de assinatura e usuários padrão no startup, fora do import do módulo
+    await run_in_threadpool(initialize)
+    tasks = []
+    if key_ring.asymmetric:
+        tasks.append(asyncio.create_task(rotate_keys_periodically()))
+    if ITEM_EVENTS_REDIS_URL and response_cache.enabled:
+        tasks.append(asyncio.create_task(consume_item_events()))
+    startup_report.mark_ready()
+    logger.info("Gateway pronto: %s", json.dumps(startup_report.to_dict()))
+    yield
+    for task in tasks:
+        task.cancel()
+    if upstream_client is not None:
+        await upstream_client.aclose()
+    password_hasher.shutdown()
 
-app = FastAPI(title="API Gateway")
+# Respostas serializadas com orjson
+app = FastAPI(title="API Gateway", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,13 +74,47 @@ class ResponseModel(BaseModel):
     data: Optional[Any] = None
     message: Optional[str] = None
 
+# Corpos de erro constantes, serializados uma única vez na inicialização
+TOKEN_REQUIRED_BODY = ResponseModel(status="error", message="Token de autenticação necessário").model_dump_json().encode()
+USER_NOT_FOUND_BODY = ResponseModel(status="error", message="Usuário não encontrado").model_dump_json().encode()
+TOKEN_EXPIRED_BODY = ResponseModel(status="error", message="Token expirado").model_dump_json().encode()
+TOKEN_INVALID_BODY = ResponseModel(status="error", message="Token inválido").model_dump_json().encode()
+RATE_LIMITED_BODY = ResponseModel(status="error", message="Limite de requisições excedido").model_dump_json().encode()
+OVERLOADED_BODY = ResponseModel(status="error", message="Serviço sobrecarregado, tente novamente").model_dump_json().encode()
+
+def error_response(body: bytes, status_code: int, headers: Optional[dict] = None) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
 # Configurações de autenticação
 SECRET_KEY = os.getenv("SECRET_KEY", "sua_chave_secreta_aqui")
-ALGORITHM = "HS256"
+ALGORITHM = os.getenv("JWT_ALGORITHM", "RS256")  # RS256 | EdDSA | HS256 (legado, sem JWKS)
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Simular banco de usuários (em produção, usar banco real)
-USERS_DB = {
+# Chaves de assinatura com kid, publicadas em /.well-known/jwks.json e rotacionadas periodicamente.
+# Ficam em PEM num diretório persistente, compartilhado por workers e réplicas (volume no compose)
+# ou montado só para leitura a partir de um secret
+JWT_ROTATION_INTERVAL = float(os.getenv("JWT_ROTATION_INTERVAL", str(24 * 3600)))
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "jwt_keys")
+key_ring = KeyRing(
+    algorithm=ALGORITHM,
+    rotation_interval=JWT_ROTATION_INTERVAL,
+    retention=ACCESS_TOKEN_EXPIRE_MINUTES * 60 * 2,
+    keys_dir=JWT_KEYS_DIR,
+    secret=SECRET_KEY
+)
+
+# Hash de senhas com scrypt em pool limitado de threads (ou processos)
+password_hasher = PasswordHasher(
+    n=int(os.getenv("KDF_N", str(2 ** 14))),
+    r=int(os.getenv("KDF_R", "8")),
+    p=int(os.getenv("KDF_P", "1")),
+    workers=int(os.getenv("KDF_WORKERS", "0")) or None,
+    executor=os.getenv("KDF_EXECUTOR", "thread")
+)
+
+# Usuários padrão, criados no store se ainda não existirem
+# Os hashes SHA256 legados são convertidos para scrypt no primeiro login
+DEFAULT_USERS = {
     "admin": {
         "username": "admin",
         "password": hashlib.sha256("admin123".encode()).hexdigest(),
@@ -49,9 +127,82 @@ USERS_DB = {
     }
 }
 
+# Store de usuários: SQL compartilhado entre réplicas (USERS_DATABASE_URL) ou memória do processo
+USERS_DATABASE_URL = os.getenv("USERS_DATABASE_URL")
+user_store = CachedUserStore(
+    SQLUserStore(
+        USERS_DATABASE_URL,
+        pool_size=int(os.getenv("USERS_DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("USERS_DB_MAX_OVERFLOW", "10"))
+    ) if USERS_DATABASE_URL else MemoryUserStore(),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+    negative_ttl=float(os.getenv("USER_CACHE_NEGATIVE_TTL", "2"))
+)
+
+def initialize():
+    """Trabalho de startup: roda no lifespan (ou direto, fora de um servidor ASGI)"""
+    with startup_report.phase("signing_keys"):
+        key_ring.rotate_if_due()
+    with startup_report.phase("user_store"):
+        user_store.backend.setup()
+        user_store.backend.seed(DEFAULT_USERS)
+
 # URL do Load Balancer
 LOAD_BALANCER_URL = os.getenv("LOAD_BALANCER_URL", "http://localhost:8001")
 
+# Cache de respostas GET (ex.: "/itens=5,/itens/{id}=30"; vazio desativa)
+# A busca vem antes de /itens/{id}: não é invalidada pela escrita de um item, então TTL curto
+response_cache = ResponseCache(
+    routes=os.getenv("RESPONSE_CACHE_TTLS", "/itens=5,/itens/busca=5,/itens/autocompletar=5,/itens/eventos=0,/itens/{id}=30"),
+    vary_on_role=os.getenv("RESPONSE_CACHE_VARY_ROLE", "false").lower() == "true",
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+)
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Eventos de alteração dos servidores (Redis Stream): invalidam o cache mesmo para
+# escritas que passaram por outra réplica do gateway
+ITEM_EVENTS_REDIS_URL = os.getenv("ITEM_EVENTS_REDIS_URL")
+ITEM_EVENTS_STREAM = os.getenv("ITEM_EVENTS_STREAM", "itens:eventos")
+# Rotas derivadas de vários itens, removidas a cada lote de eventos
+EVENT_INVALIDATED_PATHS = ["/itens/busca", "/itens/autocompletar"]
+
+# Rotas repassadas em streaming: sem cache de respostas, coalescing nem bufferização do corpo
+STREAMING_PATHS = {p.strip() for p in os.getenv("STREAMING_PATHS", "/itens/export").split(",") if p.strip()}
+
+# GETs idênticos em andamento compartilham uma única chamada ao Load Balancer
+single_flight = SingleFlight(
+    max_waiters=int(os.getenv("COALESCE_MAX_WAITERS", "100")),
+    max_response_bytes=int(os.getenv("COALESCE_MAX_RESPONSE_BYTES", str(1024 * 1024)))
+)
+COALESCE_SCOPE = os.getenv("COALESCE_SCOPE", "role")  # user | role | none
+
+# Rate limiting por usuário/rota ("rota=tokens_por_s:rajada", "*" para as demais; vazio desativa)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+rate_limiter = RateLimiter(
+    limits=parse_limits(os.getenv("RATE_LIMITS", "/itens=50:100")),
+    store=RedisBucketStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else MemoryBucketStore()
+)
+
+# Controle de admissão: limite global de requisições simultâneas ao Load Balancer
+admission = ConcurrencyLimiter(
+    max_inflight=int(os.getenv("MAX_INFLIGHT", "512")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "0")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0"))
+)
+
+# Tracing distribuído (W3C traceparent), amostrado por TRACE_SAMPLE_RATE
+tracer = tracer_from_env("api-gateway")
+
+# Cliente assíncrono compartilhado: não bloqueia o event loop durante o proxy.
+# Criado na primeira requisição (o contexto SSL custa no startup)
+upstream_client: Optional[httpx.AsyncClient] = None
+
+def get_upstream_client() -> httpx.AsyncClient:
+    global upstream_client
+    if upstream_client is None:
+        upstream_client = httpx.AsyncClient(timeout=30)
+    return upstream_client
+
 security = HTTPBearer()
 
 class UserLogin(BaseModel):
@@ -74,12 +225,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = key_ring.sign(to_encode)
     return encoded_jwt
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = key_ring.verify(credentials.credentials)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(
@@ -94,7 +245,7 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             detail="Token expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
@@ -108,23 +259,49 @@ def saude():
         data={
             "status": "saudavel",
             "servico": "api-gateway",
-            "load_balancer": LOAD_BALANCER_URL
+            "load_balancer": LOAD_BALANCER_URL,
+            "response_cache": response_cache.stats(),
+            "coalescing": single_flight.stats(),
+            "rate_limit": {"rejected": rate_limiter.rejected},
+            "admission": admission.stats(),
+            "user_cache": user_store.stats(),
+            "logging": logging_stats()
         }
     )
 
+@app.get("/pronto")
+def pronto():
+    """Readiness: startup concluído e store de usuários acessível (/saude é só liveness)"""
+    checks = {"startup": startup_report.ready, "user_store": False}
+    try:
+        user_store.backend.get("admin")
+        checks["user_store"] = True
+    except Exception as e:
+        logger.warning("Store de usuários indisponível na verificação de prontidão: %s", e)
+    status_code, data = readiness(checks)
+    return ORJSONResponse(
+        status_code=status_code,
+        content=ResponseModel(status="success" if status_code == 200 else "error", data=data).model_dump()
+    )
+
 @app.post("/register", response_model=ResponseModel)
-def register(user: UserRegister):
-    if user.username in USERS_DB:
+async def register(user: UserRegister):
+    if await user_store.aget(user.username, fresh=True) is not None:
         return ResponseModel(
             status="error",
             message="Usuário já existe"
         )
     
-    USERS_DB[user.username] = {
+    added = await run_in_threadpool(user_store.add, {
         "username": user.username,
-        "password": hashlib.sha256(user.password.encode()).hexdigest(),
+        "password": await password_hasher.hash(user.password),
         "role": user.role
-    }
+    })
+    if not added:
+        return ResponseModel(
+            status="error",
+            message="Usuário já existe"
+        )
     
     return ResponseModel(
         status="success",
@@ -132,20 +309,24 @@ def register(user: UserRegister):
     )
 
 @app.post("/login", response_model=ResponseModel)
-def login(user: UserLogin):
-    if user.username not in USERS_DB:
+async def login(user: UserLogin):
+    stored_user = await user_store.aget(user.username, fresh=True)
+    if stored_user is None:
         return ResponseModel(
             status="error",
             message="Usuário não encontrado"
         )
     
-    stored_user = USERS_DB[user.username]
-    if stored_user["password"] != hashlib.sha256(user.password.encode()).hexdigest():
+    if not await password_hasher.verify(user.password, stored_user["password"]):
         return ResponseModel(
             status="error",
             message="Senha incorreta"
         )
     
+    # Atualizar hashes legados ou com parâmetros antigos
+    if password_hasher.needs_rehash(stored_user["password"]):
+        await run_in_threadpool(user_store.update_password, user.username, await password_hasher.hash(user.password))
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username, "role": stored_user["role"]}, 
@@ -161,60 +342,114 @@ def login(user: UserLogin):
         }
     )
 
+@app.get("/.well-known/jwks.json")
+def jwks():
+    # Chaves públicas para validação local dos tokens nos serviços internos
+    return Response(
+        content=json.dumps(key_ring.jwks()),
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=300"}
+    )
+
+async def rotate_keys_periodically():
+    interval = min(60.0, JWT_ROTATION_INTERVAL / 10)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await run_in_threadpool(key_ring.rotate_if_due):
+                logger.info("Chave JWT rotacionada: %s", key_ring.current().kid)
+        except Exception as e:
+            logger.error("Erro ao rotacionar chave JWT: %s", e)
+
+async def consume_item_events():
+    import redis.asyncio as redis_asyncio
+
+    client = redis_asyncio.from_url(ITEM_EVENTS_REDIS_URL)
+    # Só o que chegar daqui em diante: o cache começa vazio
+    last_id = "$"
+    while True:
+        try:
+            entries = await client.xread({ITEM_EVENTS_STREAM: last_id}, count=500, block=5000)
+            item_ids = set()
+            for _, messages in entries:
+                for message_id, fields in messages:
+                    last_id = message_id
+                    item_ids.add(int(fields[b"item_id"]))
+            if item_ids:
+                removed = sum(response_cache.invalidate(f"/itens/{item_id}") for item_id in item_ids)
+                removed += sum(response_cache.invalidate(path) for path in EVENT_INVALIDATED_PATHS)
+                request_log.info("Eventos de %d itens, %d entradas de cache removidas", len(item_ids), removed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Erro ao consumir eventos de itens: %s", e)
+            await asyncio.sleep(1)
+
 @app.middleware("http")
 async def proxy_to_load_balancer(request: Request, call_next):
     # Se for uma requisição para endpoints de autenticação, não fazer proxy
-    if request.url.path in ["/saude", "/register", "/login", "/docs", "/openapi.json"]:
+    if request.url.path in ["/saude", "/pronto", "/register", "/login", "/docs", "/openapi.json", "/.well-known/jwks.json"]:
         return await call_next(request)
     
+    with tracer.request_span("gateway.request", request.headers.get(TRACEPARENT)) as span:
+        span.set_attribute("http.method", request.method)
+        span.set_attribute("http.path", request.url.path)
+        response = await forward_to_load_balancer(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+async def forward_to_load_balancer(request: Request) -> Response:
+    username = None
+    role = None
+    
     # Verificar autenticação para rotas protegidas
     if request.url.path.startswith("/itens"):
-        try:
-            auth_header = request.headers.get("Authorization")
-            if not auth_header or not auth_header.startswith("Bearer "):
-                return Response(
-                    content=ResponseModel(
-                        status="error",
-                        message="Token de autenticação necessário"
-                    ).model_dump_json(),
-                    status_code=401,
-                    media_type="application/json"
-                )
+        with tracer.span("auth"):
+            try:
+                auth_header = request.headers.get("Authorization")
+                if not auth_header or not auth_header.startswith("Bearer "):
+                    return error_response(TOKEN_REQUIRED_BODY, 401)
             
-            token = auth_header.split(" ")[1]
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
+                token = auth_header.split(" ")[1]
+                payload = key_ring.verify(token)
+                username = payload.get("sub")
+                role = payload.get("role")
             
-            if username not in USERS_DB:
-                return Response(
-                    content=ResponseModel(
-                        status="error",
-                        message="Usuário não encontrado"
-                    ).model_dump_json(),
-                    status_code=401,
-                    media_type="application/json"
-                )
+                if await user_store.aget(username) is None:
+                    return error_response(USER_NOT_FOUND_BODY, 401)
             
-            logger.info(f"Usuário autenticado: {username} - Requisição: {request.method} {request.url.path}")
+                request_log.info("Usuário autenticado: %s - Requisição: %s %s", username, request.method, request.url.path)
             
-        except jwt.ExpiredSignatureError:
-            return Response(
-                content=ResponseModel(
-                    status="error",
-                    message="Token expirado"
-                ).model_dump_json(),
-                status_code=401,
-                media_type="application/json"
-            )
-        except jwt.JWTError:
-            return Response(
-                content=ResponseModel(
-                    status="error",
-                    message="Token inválido"
-                ).model_dump_json(),
-                status_code=401,
-                media_type="application/json"
-            )
+            except jwt.ExpiredSignatureError:
+                return error_response(TOKEN_EXPIRED_BODY, 401)
+            except jwt.InvalidTokenError:
+                return error_response(TOKEN_INVALID_BODY, 401)
+    
+    # Rate limiting por usuário (ou IP, sem autenticação) e rota
+    subject = username or (request.client.host if request.client else "anon")
+    try:
+        allowed, wait = await rate_limiter.check(subject, request.url.path)
+    except Exception as e:
+        # Falha do store compartilhado não deve derrubar o tráfego
+        logger.error("Erro no rate limiter: %s", e)
+        allowed, wait = True, 0.0
+    if not allowed:
+        return error_response(RATE_LIMITED_BODY, 429, {"Retry-After": retry_after(wait)})
+    
+    # Servir GETs cacheáveis direto do gateway
+    cache_key = None
+    streaming = request.method == "GET" and request.url.path in STREAMING_PATHS
+    cache_ttl = response_cache.ttl_for(request.url.path) if request.method == "GET" and not streaming else None
+    if cache_ttl:
+        cache_key = response_cache.key(request.url.path, request.url.query, role)
+        cached = response_cache.get(cache_key)
+        if cached:
+            return to_response(cached, request.headers.get("If-None-Match"), "HIT")
+    
+    if not await admission.acquire():
+        return error_response(OVERLOADED_BODY, 503, {"Retry-After": "1"})
+    # No streaming a vaga de admissão fica ocupada até o fim do corpo
+    released_by_stream = False
     
     try:
         # Construir a URL completa para o Load Balancer
@@ -224,28 +459,74 @@ async def proxy_to_load_balancer(request: Request, call_next):
         
         # Fazer a requisição para o Load Balancer
         method = request.method
-        headers = dict(request.headers)
+        headers = forward_headers(request.headers, request.client.host if request.client else None)
         body = await request.body()
         
-        response = requests.request(
-            method=method,
-            url=target_url,
-            headers=headers,
-            data=body,
-            timeout=30
-        )
+        async def call_upstream() -> UpstreamResponse:
+            with tracer.span("upstream", target=target_url):
+                upstream = await get_upstream_client().request(
+                    method=method,
+                    url=target_url,
+                    headers=tracer.inject(dict(headers)),
+                    content=body
+                )
+            return UpstreamResponse(
+                content=upstream.content,
+                status_code=upstream.status_code,
+                headers=response_headers(upstream.headers, decoded=True)
+            )
+        
+        if streaming:
+            with tracer.span("upstream", target=target_url, streaming=True):
+                client = get_upstream_client()
+                upstream = await client.send(
+                    client.build_request(
+                        method=method,
+                        url=target_url,
+                        headers=tracer.inject(dict(headers)),
+                        content=body
+                    ),
+                    stream=True
+                )
+            
+            released_by_stream = True
+            return StreamingResponse(
+                relay(upstream, admission.release),
+                status_code=upstream.status_code,
+                headers=response_headers(upstream.headers)
+            )
+        
+        if method == "GET":
+            coalesce_key = f"{method} {target_url} {scope_for(COALESCE_SCOPE, username, role)}"
+            response, _ = await single_flight.do(coalesce_key, call_upstream)
+        else:
+            response = await call_upstream()
+        
+        request_log.info("Resposta do Load Balancer: %s", response.status_code)
         
-        logger.info(f"Resposta do Load Balancer: {response.status_code}")
+        if cache_key and response.status_code == 200 and is_success(response.content):
+            entry = response_cache.set(
+                cache_key,
+                request.url.path,
+                response.content,
+                response.status_code,
+                response.headers,
+                cache_ttl
+            )
+            return to_response(entry, request.headers.get("If-None-Match"), "MISS")
+        
+        if method in MUTATING_METHODS and response.status_code < 400:
+            response_cache.invalidate(request.url.path)
         
         # Retornar a resposta do Load Balancer
         return Response(
             content=response.content,
             status_code=response.status_code,
-            headers=dict(response.headers)
+            headers=response.headers
         )
         
     except Exception as e:
-        logger.error(f"Erro ao conectar com Load Balancer: {str(e)}")
+        logger.error("Erro ao conectar com Load Balancer: %s", e)
         return Response(
             content=ResponseModel(
                 status="error",
@@ -253,4 +534,10 @@ async def proxy_to_load_balancer(request: Request, call_next):
             ).model_dump_json(),
             status_code=500,
             media_type="application/json"
-        ) 
\ No newline at end of file
+        )
+    finally:
+        if not released_by_stream:
+            await admission.release()
+
+# Fim do import do módulo; o restante do startup é medido no lifespan
+startup_report.imports_finished()
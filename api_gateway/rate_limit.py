@@ -0,0 +1,172 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Script atômico do token bucket para o store compartilhado no Redis.
+# Retorna {permitido (0/1), segundos até haver um token}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+def parse_limits(config: str) -> Dict[str, Tuple[float, float]]:
+    """Converte "/itens=20:40,*=50:100" em {rota: (tokens/s, capacidade)}"""
+    limits = {}
+    for entry in config.split(","):
+        entry = entry.strip()
+        if not entry or "=" not in entry:
+            continue
+        route, spec = entry.rsplit("=", 1)
+        rate, _, burst = spec.partition(":")
+        limits[route.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class MemoryBucketStore:
+    """Token buckets em memória do processo, em ordem de uso (LRU)"""
+
+    def __init__(self, max_buckets: int = 100000):
+        # chave -> (tokens, último acesso, instante em que o bucket volta a ficar cheio)
+        self.buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self.max_buckets = max_buckets
+
+    async def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, ts, _ = self.buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - ts) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            allowed, wait = True, 0.0
+        else:
+            allowed, wait = False, (1 - tokens) / rate
+        self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+        self.buckets.move_to_end(key)
+        self._evict(now)
+        return allowed, wait
+
+    def _evict(self, now: float):
+        # O mais antigo primeiro: sai sem custo se já estaria cheio de novo (capacity/rate
+        # depois do último uso); acima de max_buckets sai de qualquer forma. O(1) amortizado
+        while self.buckets:
+            _, (_, _, full_at) = next(iter(self.buckets.items()))
+            if full_at > now and len(self.buckets) <= self.max_buckets:
+                break
+            self.buckets.popitem(last=False)
+
+
+class RedisBucketStore:
+    """Token buckets compartilhados entre réplicas do gateway via Redis"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis_asyncio
+
+        self.client = redis_asyncio.from_url(url)
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefix = prefix
+
+    async def take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        allowed, wait = await self.script(keys=[self.prefix + key], args=[rate, capacity, time.time()])
+        return bool(int(allowed)), float(wait)
+
+
+class RateLimiter:
+    """Token bucket por usuário e rota"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], store):
+        self.limits = limits
+        self.store = store
+        self.rejected = 0
+
+    def limit_for(self, path: str) -> Optional[Tuple[str, float, float]]:
+        # Usa o prefixo de rota mais longo configurado; "*" vale para o resto
+        best = None
+        for route, (rate, capacity) in self.limits.items():
+            if route != "*" and path.startswith(route) and (best is None or len(route) > len(best[0])):
+                best = (route, rate, capacity)
+        if best is None and "*" in self.limits:
+            rate, capacity = self.limits["*"]
+            best = ("*", rate, capacity)
+        return best
+
+    async def check(self, subject: str, path: str) -> Tuple[bool, float]:
+        """Consome um token; retorna (permitido, segundos para tentar de novo)"""
+        limit = self.limit_for(path)
+        if limit is None:
+            return True, 0.0
+        route, rate, capacity = limit
+        allowed, wait = await self.store.take(f"{subject}|{route}", rate, capacity)
+        if not allowed:
+            self.rejected += 1
+        return allowed, wait
+
+
+class ConcurrencyLimiter:
+    """Controle de admissão: limita requisições simultâneas e descarta o excesso logo na entrada"""
+
+    def __init__(self, max_inflight: int, max_queue: int = 0, queue_timeout: float = 0.0):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self.queued = 0
+        self.shed = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> bool:
+        if self.inflight < self.max_inflight:
+            self.inflight += 1
+            return True
+        if self.queued >= self.max_queue or self.queue_timeout <= 0:
+            self.shed += 1
+            return False
+        self.queued += 1
+        try:
+            async with self.condition:
+                await asyncio.wait_for(
+                    self.condition.wait_for(lambda: self.inflight < self.max_inflight),
+                    timeout=self.queue_timeout
+                )
+                self.inflight += 1
+                return True
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.queued -= 1
+
+    async def release(self):
+        self.inflight -= 1
+        if self.queued:
+            async with self.condition:
+                self.condition.notify()
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "queued": self.queued,
+            "shed": self.shed
+        }
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
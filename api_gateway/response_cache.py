@@ -0,0 +1,176 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from starlette.responses import Response
+
+# Cabeçalhos do upstream que não devem ser repetidos numa resposta servida do cache
+SKIP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection", "date", "server"}
+
+
+@dataclass
+class CachedResponse:
+    content: bytes
+    status_code: int
+    headers: Dict[str, str]
+    etag: str
+    path: str
+    expires_at: float
+    ttl: float = field(default=0.0)
+
+
+def parse_routes(config: str) -> List[Tuple[re.Pattern, float]]:
+    """Converte "/itens=5,/itens/{id}=30" em uma lista (regex da rota, TTL)"""
+    routes = []
+    for entry in config.split(","):
+        entry = entry.strip()
+        if not entry or "=" not in entry:
+            continue
+        route, ttl = entry.rsplit("=", 1)
+        pattern = "/".join(
+            "[^/]+" if part.startswith("{") else re.escape(part)
+            for part in route.strip().split("/")
+        )
+        routes.append((re.compile(f"^{pattern}$"), float(ttl)))
+    return routes
+
+
+def is_success(content: bytes) -> bool:
+    """Só o envelope {"status": "success"} é cacheável: os servidores respondem 200
+    também com {"status": "error"} (falha no banco, item não encontrado)"""
+    # O status é o primeiro campo do ResponseModel: sem parsear o corpo no caso comum
+    if content[:32].lstrip().startswith(b'{"status":"success"'):
+        return True
+    try:
+        body = json.loads(content)
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("status") == "success"
+
+
+def make_etag(content: bytes) -> str:
+    return '"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Cache LRU de respostas GET com TTL por rota e invalidação por recurso"""
+
+    def __init__(self, routes: str, vary_on_role: bool = False, max_entries: int = 1000):
+        self.routes = parse_routes(routes)
+        self.vary_on_role = vary_on_role
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.keys_by_path: Dict[str, Set[str]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.routes)
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        for pattern, ttl in self.routes:
+            if pattern.match(path):
+                return ttl if ttl > 0 else None
+        return None
+
+    def key(self, path: str, query: str, role: Optional[str] = None) -> str:
+        key = f"{path}?{query}"
+        if self.vary_on_role:
+            key += f"#{role or ''}"
+        return key
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, path: str, content: bytes, status_code: int, headers: Dict[str, str], ttl: float) -> CachedResponse:
+        entry = CachedResponse(
+            content=content,
+            status_code=status_code,
+            headers={k: v for k, v in headers.items() if k.lower() not in SKIP_HEADERS},
+            etag=make_etag(content),
+            path=path,
+            expires_at=time.monotonic() + ttl,
+            ttl=ttl
+        )
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.keys_by_path.setdefault(path, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+        return entry
+
+    def invalidate(self, path: str) -> int:
+        """Remove o recurso alterado, sua coleção e os sub-recursos dele"""
+        path = path.rstrip("/") or "/"
+        parent = path.rsplit("/", 1)[0] or "/"
+        with self.lock:
+            paths = [
+                p for p in self.keys_by_path
+                if p == path or p == parent or p.startswith(path + "/")
+            ]
+            removed = 0
+            for p in paths:
+                for key in list(self.keys_by_path.get(p, ())):
+                    self._remove(key)
+                    removed += 1
+            return removed
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self.keys_by_path.get(entry.path)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_path[entry.path]
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def to_response(entry: CachedResponse, if_none_match: Optional[str], cache_status: str) -> Response:
+    """Monta a resposta a partir do cache, respondendo 304 quando o ETag confere"""
+    headers = {
+        **entry.headers,
+        "ETag": entry.etag,
+        "Cache-Control": f"private, max-age={int(entry.ttl)}",
+        "X-Cache": cache_status
+    }
+    if etag_matches(if_none_match, entry.etag):
+        headers.pop("content-type", None)
+        headers.pop("Content-Type", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.content, status_code=entry.status_code, headers=headers)
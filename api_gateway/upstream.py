@@ -0,0 +1,99 @@
+import inspect
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalhos hop-by-hop (RFC 7230, seção 6.1) e os que o cliente HTTP recalcula
+HOP_BY_HOP = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade"
+}
+RECOMPUTED = {"host", "content-length"}
+
+
+def _connection_tokens(headers: Mapping[str, str]) -> set:
+    # Cabeçalhos listados em "Connection" também são hop-by-hop
+    return {t.strip().lower() for t in headers.get("connection", "").split(",") if t.strip()}
+
+
+def forward_headers(headers: Mapping[str, str], client_host: Optional[str] = None) -> Dict[str, str]:
+    """Cabeçalhos da requisição que devem seguir para o servidor"""
+    skip = HOP_BY_HOP | RECOMPUTED | _connection_tokens(headers)
+    forwarded = {k: v for k, v in headers.items() if k.lower() not in skip}
+    if client_host:
+        previous = headers.get("x-forwarded-for")
+        forwarded["x-forwarded-for"] = f"{previous}, {client_host}" if previous else client_host
+    return forwarded
+
+
+def response_headers(headers: Mapping[str, str], decoded: bool = False) -> Dict[str, str]:
+    """Cabeçalhos da resposta do servidor que devem voltar ao cliente.
+
+    `decoded`: o corpo repassado já foi descomprimido pelo httpx (`.content`),
+    então o Content-Encoding do servidor não vale mais para ele.
+    """
+    skip = HOP_BY_HOP | {"content-length"} | _connection_tokens(headers)
+    if decoded:
+        skip = skip | {"content-encoding"}
+    return {k: v for k, v in headers.items() if k.lower() not in skip}
+
+
+async def relay(response: httpx.Response, on_close: Callable[[], Union[None, Awaitable[None]]]) -> AsyncIterator[bytes]:
+    """Bytes crus da resposta em streaming (o Content-Encoding do servidor chega intacto).
+
+    Fecha a resposta e chama `on_close` ao fim do corpo, também quando o servidor
+    cai no meio ou o cliente desconecta: no Starlette o BackgroundTask da resposta
+    não roda se o iterador do corpo levanta exceção.
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        try:
+            await response.aclose()
+        finally:
+            result = on_close()
+            if inspect.isawaitable(result):
+                await result
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_client(
+    base_url: str,
+    max_connections: int = 100,
+    max_keepalive: int = 20,
+    keepalive_expiry: float = 30.0,
+    timeout: float = 30.0,
+    connect_timeout: float = 5.0,
+    http2: bool = False
+) -> httpx.AsyncClient:
+    """Cliente persistente (pool com keep-alive) para um servidor"""
+    if http2 and not http2_available():
+        logger.warning("UPSTREAM_HTTP2 ativo mas o pacote h2 não está instalado (pip install httpx[http2]); usando HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
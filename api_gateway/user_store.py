@@ -0,0 +1,176 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class UserStore(ABC):
+    """Interface do armazenamento de usuários do gateway"""
+
+    def setup(self):
+        """Prepara o armazenamento no startup (ex.: cria a tabela)"""
+
+    @abstractmethod
+    def get(self, username: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def add(self, user: dict) -> bool:
+        """Insere o usuário; retorna False se ele já existir"""
+
+    @abstractmethod
+    def update_password(self, username: str, password: str):
+        ...
+
+    def seed(self, users: Dict[str, dict]):
+        for user in users.values():
+            if self.get(user["username"]) is None:
+                self.add(user)
+
+
+class MemoryUserStore(UserStore):
+    """Usuários num dicionário do processo (não compartilhado entre réplicas)"""
+
+    def __init__(self):
+        self.users: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[dict]:
+        user = self.users.get(username)
+        return dict(user) if user else None
+
+    def add(self, user: dict) -> bool:
+        with self.lock:
+            if user["username"] in self.users:
+                return False
+            self.users[user["username"]] = dict(user)
+            return True
+
+    def update_password(self, username: str, password: str):
+        with self.lock:
+            if username in self.users:
+                self.users[username]["password"] = password
+
+
+class SQLUserStore(UserStore):
+    """Usuários numa tabela SQL indexada por username, com pool de conexões"""
+
+    def __init__(self, url: str, pool_size: int = 5, max_overflow: int = 10):
+        # SQLAlchemy só é importado quando o store SQL é usado
+        from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+
+        options = {"pool_pre_ping": True}
+        if not url.startswith("sqlite"):
+            options.update(pool_size=pool_size, max_overflow=max_overflow)
+        self.engine = create_engine(url, **options)
+        self.metadata = MetaData()
+        self.table = Table(
+            "usuarios",
+            self.metadata,
+            Column("id", Integer, primary_key=True),
+            Column("username", String(100), nullable=False, unique=True, index=True),
+            Column("password", String(255), nullable=False),
+            Column("role", String(50), nullable=False, default="user")
+        )
+
+    def setup(self):
+        self.metadata.create_all(self.engine)
+
+    def get(self, username: str) -> Optional[dict]:
+        from sqlalchemy import select
+
+        t = self.table
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(t.c.username, t.c.password, t.c.role).where(t.c.username == username)
+            ).first()
+        return dict(row._mapping) if row else None
+
+    def add(self, user: dict) -> bool:
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self.table.insert().values(
+                    username=user["username"],
+                    password=user["password"],
+                    role=user.get("role", "user")
+                ))
+            return True
+        except IntegrityError:
+            return False
+
+    def update_password(self, username: str, password: str):
+        with self.engine.begin() as conn:
+            conn.execute(
+                self.table.update().where(self.table.c.username == username).values(password=password)
+            )
+
+
+class CachedUserStore(UserStore):
+    """Cache local com TTL na frente de outro store.
+
+    Consultas em cache não saem do event loop; só as faltas vão ao backend
+    numa thread. Ausências ficam em cache por menos tempo, para que um
+    registro feito em outra réplica apareça rápido.
+    """
+
+    def __init__(self, backend: UserStore, ttl: float = 30.0, negative_ttl: float = 2.0, max_entries: int = 10000):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.entries: Dict[str, Tuple[Optional[dict], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, username: str) -> Tuple[bool, Optional[dict]]:
+        entry = self.entries.get(username)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return True, entry[0]
+        self.misses += 1
+        return False, None
+
+    def _store(self, username: str, user: Optional[dict]):
+        if len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        ttl = self.ttl if user is not None else self.negative_ttl
+        self.entries[username] = (user, time.monotonic() + ttl)
+
+    def get(self, username: str) -> Optional[dict]:
+        found, user = self._cached(username)
+        if found:
+            return user
+        user = self.backend.get(username)
+        self._store(username, user)
+        return user
+
+    async def aget(self, username: str, fresh: bool = False) -> Optional[dict]:
+        if not fresh:
+            found, user = self._cached(username)
+            if found:
+                return user
+        user = await run_in_threadpool(self.backend.get, username)
+        self._store(username, user)
+        return user
+
+    def add(self, user: dict) -> bool:
+        added = self.backend.add(user)
+        self.entries.pop(user["username"], None)
+        return added
+
+    def update_password(self, username: str, password: str):
+        self.backend.update_password(username, password)
+        self.entries.pop(username, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,45 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_service(directory: str, module_name: str):
+    """Importa o main.py de um serviço com nome próprio (todos se chamam "main")"""
+    service_dir = ROOT / directory
+    if str(service_dir) not in sys.path:
+        sys.path.insert(0, str(service_dir))
+    spec = importlib.util.spec_from_file_location(module_name, service_dir / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/p999 e média, em milissegundos (amostras em segundos)"""
+    if not samples:
+        return {"count": 0, "avg_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "p999_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "avg_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+        "p999_ms": pick(0.999),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def emit(report: dict, output: str = None):
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        Path(output).write_text(text)
+    print(text)
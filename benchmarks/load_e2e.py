@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Carga ponta a ponta na cadeia gateway -> load balancer -> servidores.
+
+Sobe os quatro serviços com uvicorn em subprocessos (SQLite compartilhado,
+sem Postgres nem Redis: o rate limit usa o store em memória), faz login e
+dispara carga em malha aberta a uma taxa fixa em /itens, com proporção
+configurável de leituras e escritas. A latência é medida a partir do
+instante agendado (sem omissão coordenada). A latência por salto vem dos
+spans de tracing exportados em arquivo; a CPU de cada serviço vem de /proc.
+
+    python benchmarks/load_e2e.py --rps 200 --duration 30 --write-ratio 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from common import ROOT, emit, percentiles
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def cpu_seconds(pid: int) -> Optional[float]:
+    """utime + stime do processo (Linux); None se /proc não estiver disponível"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+class Service:
+    def __init__(self, name: str, directory: str, port: int, env: Dict[str, str], workdir: Path):
+        self.name = name
+        self.directory = directory
+        self.port = port
+        self.env = env
+        self.log_path = workdir / f"{name}.log"
+        self.trace_path = workdir / f"{name}.spans.jsonl"
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        env = {
+            **os.environ,
+            "TRACE_EXPORT_FILE": str(self.trace_path),
+            "TRACE_EXPORT_INTERVAL": "0.5",
+            **self.env
+        }
+        self.log_file = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=ROOT / self.directory,
+            env=env,
+            stdout=self.log_file,
+            stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} terminou ao iniciar; veja {self.log_path}")
+            try:
+                if httpx.get(f"{self.url}/pronto", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.name} não respondeu em {timeout}s; veja {self.log_path}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.process:
+            self.log_file.close()
+
+
+def start_chain(args, workdir: Path) -> List[Service]:
+    database_url = f"sqlite:///{workdir / 'bench.db'}"
+    common = {
+        "TRACE_SAMPLE_RATE": str(args.trace_sample_rate),
+        "LOG_REQUEST_SAMPLE_RATE": "0"
+    }
+    server1 = Service("server1", "server", args.base_port + 2, {**common, "DATABASE_URL": database_url, "PORTA": str(args.base_port + 2), "TRACE_SERVICE_NAME": "server1"}, workdir)
+    server2 = Service("server2", "server2", args.base_port + 3, {**common, "DATABASE_URL": database_url, "PORTA": str(args.base_port + 3), "TRACE_SERVICE_NAME": "server2"}, workdir)
+    balancer = Service("load_balancer", "load_balancer", args.base_port + 1, {**common, "SERVIDORES": f"{server1.url},{server2.url}"}, workdir)
+    gateway = Service("api_gateway", "api_gateway", args.base_port, {
+        **common,
+        "LOAD_BALANCER_URL": balancer.url,
+        "RATE_LIMITS": "",
+        "RESPONSE_CACHE_TTLS": args.response_cache,
+        "MAX_INFLIGHT": str(args.max_inflight)
+    }, workdir)
+
+    # Schema criado pelas migrações antes de subir os servidores
+    subprocess.run(
+        [sys.executable, "migrations.py", "upgrade"],
+        cwd=ROOT / "server",
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True,
+        stdout=subprocess.DEVNULL
+    )
+
+    services = [server1, server2, balancer, gateway]
+    try:
+        for service in services:
+            service.start()
+            service.wait_ready()
+    except Exception:
+        for service in services:
+            service.stop()
+        raise
+    return services
+
+
+def read_spans(services: List[Service], since_ns: int = 0) -> List[dict]:
+    """Spans gravados pelos serviços, ignorando os do login, da carga inicial e do aquecimento"""
+    spans = []
+    for service in services:
+        if not service.trace_path.exists():
+            continue
+        for line in service.trace_path.read_text().splitlines():
+            for resource in json.loads(line)["resourceSpans"]:
+                name = resource["resource"]["attributes"][0]["value"]["stringValue"]
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        if int(span["startTimeUnixNano"]) < since_ns:
+                            continue
+                        spans.append({
+                            "service": name,
+                            "name": span["name"],
+                            "trace_id": span["traceId"],
+                            "duration": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9
+                        })
+    return spans
+
+
+def hop_breakdown(spans: List[dict]) -> dict:
+    """Percentis por span e tempo próprio de cada salto (raiz menos a raiz seguinte)"""
+    by_span = defaultdict(list)
+    roots = defaultdict(dict)
+    for span in spans:
+        by_span[f"{span['service']}:{span['name']}"].append(span["duration"])
+        if span["name"].endswith(".request"):
+            roots[span["trace_id"]][span["name"]] = span["duration"]
+
+    hops = defaultdict(list)
+    for trace in roots.values():
+        if {"gateway.request", "lb.request", "server.request"} <= trace.keys():
+            hops["gateway"].append(trace["gateway.request"] - trace["lb.request"])
+            hops["load_balancer"].append(trace["lb.request"] - trace["server.request"])
+            hops["server"].append(trace["server.request"])
+    return {
+        "spans": {key: percentiles(values) for key, values in sorted(by_span.items())},
+        "self_time": {hop: percentiles(values) for hop, values in hops.items()}
+    }
+
+
+async def drive(args, gateway_url: str, on_measure_start) -> dict:
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=gateway_url, limits=limits, timeout=args.timeout) as client:
+        login = await client.post("/login", json={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {login.json()['data']['access_token']}"}
+
+        ids = []
+        for i in range(args.seed_items):
+            created = await client.post("/itens", headers=headers, json={"nome": f"Item {i}", "descricao": "benchmark", "preco": i + 0.5})
+            ids.append(created.json()["data"]["id"])
+
+        samples = defaultdict(list)
+        statuses = defaultdict(int)
+        errors = 0
+
+        async def one(kind: str, scheduled: float, measured: bool):
+            nonlocal errors
+            try:
+                if kind == "write":
+                    response = await client.post("/itens", headers=headers, json={"nome": "novo", "descricao": "benchmark", "preco": 1.0})
+                elif kind == "list":
+                    response = await client.get("/itens", headers=headers)
+                else:
+                    response = await client.get(f"/itens/{random.choice(ids)}", headers=headers)
+                ok = response.status_code < 400 and response.json().get("status") == "success"
+                status = str(response.status_code)
+            except Exception as e:
+                ok, status = False, type(e).__name__
+            if measured:
+                samples[kind].append(time.perf_counter() - scheduled)
+                statuses[status] += 1
+                errors += 0 if ok else 1
+
+        interval = 1.0 / args.rps
+        total = args.warmup + args.duration
+        tasks = []
+        start = time.perf_counter()
+        cpu_start = None
+        measure_start_ns = None
+        i = 0
+        while i * interval < total:
+            scheduled = start + i * interval
+            measured = i * interval >= args.warmup
+            if measured and cpu_start is None:
+                cpu_start = time.perf_counter()
+                measure_start_ns = time.time_ns()
+                on_measure_start()
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            roll = random.random()
+            kind = "write" if roll < args.write_ratio else "list" if roll < args.write_ratio + args.list_ratio else "read"
+            tasks.append(asyncio.create_task(one(kind, scheduled, measured)))
+            i += 1
+        sent_for = time.perf_counter() - (cpu_start or start)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - (cpu_start or start)
+
+    all_samples = [s for values in samples.values() for s in values]
+    return {
+        "requests": len(all_samples),
+        "achieved_rps": len(all_samples) / sent_for if sent_for else 0.0,
+        "elapsed_s": elapsed,
+        "errors": errors,
+        "status_codes": dict(statuses),
+        "end_to_end": percentiles(all_samples),
+        "by_kind": {kind: percentiles(values) for kind, values in samples.items()},
+        "measure_start_ns": measure_start_ns
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="fração de POST /itens")
+    parser.add_argument("--list-ratio", type=float, default=0.1, help="fração de GET /itens (o resto é GET /itens/{id})")
+    parser.add_argument("--seed-items", type=int, default=100)
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--trace-sample-rate", type=float, default=0.1, help="fração das requisições com spans por salto")
+    parser.add_argument("--response-cache", default="", help="RESPONSE_CACHE_TTLS do gateway (vazio desativa)")
+    parser.add_argument("--max-inflight", type=int, default=512)
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--workdir", help="diretório para banco, logs e spans (padrão: temporário)")
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-e2e-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    services = start_chain(args, workdir)
+    cpu_before: Dict[str, Optional[float]] = {}
+
+    def on_measure_start():
+        for service in services:
+            cpu_before[service.name] = cpu_seconds(service.process.pid)
+
+    try:
+        load = asyncio.run(drive(args, services[-1].url, on_measure_start))
+        cpu = {}
+        for service in services:
+            after = cpu_seconds(service.process.pid)
+            before = cpu_before.get(service.name)
+            if after is not None and before is not None:
+                cpu[service.name] = {
+                    "cpu_s": after - before,
+                    "cpu_percent": (after - before) / load["elapsed_s"] * 100
+                }
+        # Dá tempo para os exportadores gravarem os últimos lotes de spans
+        time.sleep(1.5)
+    finally:
+        for service in services:
+            service.stop()
+
+    measure_start_ns = load.pop("measure_start_ns") or 0
+    emit({
+        "revision": git_revision(),
+        "config": {
+            "rps": args.rps,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "write_ratio": args.write_ratio,
+            "list_ratio": args.list_ratio,
+            "trace_sample_rate": args.trace_sample_rate,
+            "response_cache": args.response_cache
+        },
+        **load,
+        "per_hop": hop_breakdown(read_spans(services, measure_start_ns)),
+        "cpu": cpu,
+        "workdir": str(workdir)
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Throughput de /login e latência de /itens durante uma rajada de logins.
+
+Roda o API Gateway em processo com um upstream falso (latência zero) e mede
+se o hash de senhas no pool de threads deixa o event loop livre.
+
+    python benchmarks/login_throughput.py --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from common import emit, load_service, percentiles
+
+
+async def run(args) -> dict:
+    gateway = load_service("api_gateway", "gateway_main")
+    # Sem servidor ASGI não há lifespan: chave de assinatura e usuários padrão aqui
+    gateway.initialize()
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "success", "data": []})
+
+    gateway.upstream_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    transport = httpx.ASGITransport(app=gateway.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        login = await client.post("/login", json={"username": "admin", "password": "admin123"})
+        token = login.json()["data"]["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        deadline = time.perf_counter() + args.duration
+        login_samples, itens_samples = [], []
+        errors = 0
+
+        async def login_worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/login", json={"username": "admin", "password": "admin123"})
+                login_samples.append(time.perf_counter() - start)
+                if response.json().get("status") != "success":
+                    errors += 1
+
+        async def itens_probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/itens", headers=headers)
+                itens_samples.append(time.perf_counter() - start)
+                await asyncio.sleep(args.probe_interval)
+
+        started = time.perf_counter()
+        await asyncio.gather(itens_probe(), *[login_worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    gateway.password_hasher.shutdown()
+    return {
+        "concurrency": args.concurrency,
+        "duration_s": elapsed,
+        "kdf": {
+            "n": gateway.password_hasher.n,
+            "r": gateway.password_hasher.r,
+            "p": gateway.password_hasher.p,
+            "workers": gateway.password_hasher.workers,
+            "executor": gateway.password_hasher.executor_kind
+        },
+        "logins_per_s": len(login_samples) / elapsed,
+        "login_errors": errors,
+        "login_latency": percentiles(login_samples),
+        "itens_latency_during_burst": percentiles(itens_samples)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+    # Sem rate limiting nem cache para medir apenas o caminho de login
+    os.environ.setdefault("RATE_LIMITS", "")
+    os.environ.setdefault("RESPONSE_CACHE_TTLS", "")
+    emit(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Overhead por requisição dos middlewares de proxy do gateway e do load balancer.
+
+Roda cada app em processo (ASGITransport) contra um upstream falso de
+latência zero e compara com um app que devolve o mesmo corpo direto, para
+tamanhos de payload de 100 B a 10 MB e concorrência de 1 a 1000. Mede também,
+isoladas, as etapas do caminho quente: autenticação, cópia de cabeçalhos,
+bufferização do corpo e construção da resposta.
+
+    python benchmarks/proxy_overhead.py --sizes 100,10000,1000000,10000000 --concurrency 1,10,100,1000
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List
+
+import httpx
+from starlette.responses import Response
+
+from common import emit, load_service, percentiles
+
+CHUNK = 64 * 1024
+
+
+def configure_env():
+    # Só o caminho de proxy: sem cache de respostas, rate limit, spans ou logs por requisição
+    os.environ.setdefault("JWT_ALGORITHM", "RS256")
+    os.environ["RESPONSE_CACHE_TTLS"] = ""
+    os.environ["RATE_LIMITS"] = ""
+    os.environ["MAX_INFLIGHT"] = "100000"
+    os.environ["TRACE_SAMPLE_RATE"] = "0"
+    os.environ["LOG_REQUEST_SAMPLE_RATE"] = "0"
+    os.environ["SERVIDORES"] = "http://stub"
+
+
+def stub_transport(payloads: Dict[int, bytes]) -> httpx.MockTransport:
+    """Upstream de latência zero; o tamanho do corpo vem do parâmetro ?size="""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = payloads[int(request.url.params.get("size", "100"))]
+        # stream=... para o load balancer poder ler com aiter_raw
+        return httpx.Response(200, headers={"content-type": "application/json"}, stream=httpx.ByteStream(body))
+    return httpx.MockTransport(handler)
+
+
+def direct_app(payloads: Dict[int, bytes]):
+    """Linha de base: mesmo corpo, sem proxy"""
+    async def app(scope, receive, send):
+        size = int(dict(p.split("=") for p in scope["query_string"].decode().split("&") if p).get("size", "100"))
+        await Response(content=payloads[size], media_type="application/json")(scope, receive, send)
+    return app
+
+
+async def run_cell(app, path: str, size: int, concurrency: int, requests: int, method: str, headers: dict) -> dict:
+    body = b"x" * size if method == "POST" else None
+    samples: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limits, timeout=120) as client:
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.request(method, path, params={"size": size}, content=body, headers=headers)
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200 or len(response.content) != size:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    return {"rps": len(samples) / elapsed, "errors": errors, **percentiles(samples)}
+
+
+def per_call_us(fn: Callable[[], object], iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def async_per_call_us(fn, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        await fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def phases(gateway, balancer, sizes: List[int], payloads: Dict[int, bytes], token: str, iterations: int) -> dict:
+    request_headers = {
+        "host": "gateway",
+        "user-agent": "bench",
+        "accept": "*/*",
+        "authorization": f"Bearer {token}",
+        "connection": "keep-alive",
+        "x-forwarded-for": "10.0.0.1"
+    }
+    upstream_headers = {"content-type": "application/json", "content-length": "100", "date": "now", "server": "uvicorn"}
+
+    async def gateway_auth():
+        payload = gateway.key_ring.verify(token)
+        await gateway.user_store.aget(payload["sub"])
+
+    report = {
+        "gateway": {
+            "auth_us": await async_per_call_us(gateway_auth, iterations),
+            "header_copy_us": per_call_us(lambda: gateway.tracer.inject(dict(request_headers)), iterations)
+        },
+        "load_balancer": {
+            "select_backend_us": per_call_us(balancer.registry.select, iterations),
+            "forward_headers_us": per_call_us(lambda: balancer.forward_headers(request_headers, "10.0.0.2"), iterations),
+            "response_headers_us": per_call_us(lambda: balancer.response_headers(upstream_headers), iterations)
+        },
+        "by_size": []
+    }
+    for size in sizes:
+        chunks = [payloads[size][i:i + CHUNK] for i in range(0, size, CHUNK)]
+        n = max(10, iterations // max(1, size // 10000))
+        report["by_size"].append({
+            "size": size,
+            # O load balancer junta os pedaços de aiter_raw; o gateway recebe o corpo inteiro do httpx
+            "body_buffering_us": per_call_us(lambda: b"".join(chunks), n),
+            "response_construction_us": per_call_us(
+                lambda: Response(content=payloads[size], status_code=200, headers=balancer.response_headers(upstream_headers)), n
+            )
+        })
+    return report
+
+
+async def run(args) -> dict:
+    configure_env()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    payloads = {size: b"x" * size for size in sizes}
+
+    gateway = load_service("api_gateway", "gateway_main")
+    balancer = load_service("load_balancer", "lb_main")
+    gateway.initialize()
+    gateway.upstream_client = httpx.AsyncClient(transport=stub_transport(payloads), timeout=120)
+    for backend in balancer.registry.backends.values():
+        backend.client = httpx.AsyncClient(base_url=backend.url, transport=stub_transport(payloads), timeout=120)
+
+    token = gateway.create_access_token({"sub": "admin", "role": "admin"})
+    auth = {"Authorization": f"Bearer {token}"}
+    apps = {
+        "direct": (direct_app(payloads), {}),
+        "gateway": (gateway.app, auth),
+        "load_balancer": (balancer.app, {})
+    }
+
+    cells = []
+    for size in sizes:
+        for concurrency in levels:
+            # Menos requisições para payloads grandes, pelo menos uma por cliente
+            requests = max(concurrency, args.requests // max(1, size // 100000))
+            cell = {"size": size, "concurrency": concurrency, "requests": requests}
+            for name, (app, headers) in apps.items():
+                cell[name] = await run_cell(app, "/itens", size, concurrency, requests, args.method, headers)
+            for name in ("gateway", "load_balancer"):
+                cell[f"{name}_overhead_us"] = {
+                    "p50": (cell[name]["p50_ms"] - cell["direct"]["p50_ms"]) * 1000,
+                    "p99": (cell[name]["p99_ms"] - cell["direct"]["p99_ms"]) * 1000
+                }
+            cells.append(cell)
+
+    report = {
+        "method": args.method,
+        "cells": cells,
+        "phases": await phases(gateway, balancer, sizes, payloads, token, args.iterations)
+    }
+    await gateway.upstream_client.aclose()
+    await balancer.registry.close()
+    gateway.password_hasher.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000,1000000,10000000", help="tamanhos de payload em bytes")
+    parser.add_argument("--concurrency", default="1,10,100,1000", help="níveis de concorrência")
+    parser.add_argument("--requests", type=int, default=2000, help="requisições por célula (reduzido para payloads grandes)")
+    parser.add_argument("--method", choices=["GET", "POST"], default="GET", help="POST envia o payload também no corpo da requisição")
+    parser.add_argument("--iterations", type=int, default=5000, help="iterações dos microbenchmarks por etapa")
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+    emit(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Custo de serialização dos envelopes ResponseModel.
+
+Compara, para listagens de N itens, o caminho padrão do FastAPI (pydantic ->
+jsonable_encoder -> json), o ORJSONResponse e as linhas serializadas direto
+com orjson; e, para os erros 401 do gateway, model_dump_json por requisição
+contra o corpo pré-serializado.
+
+    python benchmarks/serialization.py --sizes 1,100,1000 --iterations 2000
+"""
+import argparse
+import time
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from common import emit
+
+FIELDS = ("id", "nome", "descricao", "preco")
+
+
+class ResponseModel(BaseModel):
+    status: str
+    data: Optional[Any] = None
+    message: Optional[str] = None
+
+
+def make_rows(size: int) -> list:
+    return [(i, f"Item {i}", f"Descrição do item {i}", i * 1.5) for i in range(size)]
+
+
+def per_call_us(fn: Callable[[], Any], iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_list(size: int, iterations: int) -> dict:
+    rows = make_rows(size)
+
+    def fastapi_default():
+        # Endpoint devolvendo ResponseModel com item_to_dict, renderizado pelo JSONResponse
+        model = ResponseModel(status="success", data=[dict(zip(FIELDS, row)) for row in rows])
+        return JSONResponse(jsonable_encoder(model)).body
+
+    def orjson_response():
+        model = ResponseModel(status="success", data=[dict(zip(FIELDS, row)) for row in rows])
+        return ORJSONResponse(jsonable_encoder(model)).body
+
+    def rows_to_bytes():
+        # Caminho atual de GET /itens nos servidores
+        return Response(
+            content=orjson.dumps({"status": "success", "data": [dict(zip(FIELDS, row)) for row in rows], "message": None}),
+            media_type="application/json"
+        ).body
+
+    assert orjson.loads(fastapi_default()) == orjson.loads(rows_to_bytes())
+    iterations = max(10, iterations // max(1, size // 100))
+    results = {
+        "fastapi_default_us": per_call_us(fastapi_default, iterations),
+        "orjson_response_us": per_call_us(orjson_response, iterations),
+        "rows_to_bytes_us": per_call_us(rows_to_bytes, iterations)
+    }
+    results["speedup"] = results["fastapi_default_us"] / results["rows_to_bytes_us"]
+    return {"items": size, "bytes": len(rows_to_bytes()), "iterations": iterations, **results}
+
+
+def bench_error(iterations: int) -> dict:
+    body = ResponseModel(status="error", message="Token inválido").model_dump_json().encode()
+
+    def per_request():
+        return Response(
+            content=ResponseModel(status="error", message="Token inválido").model_dump_json(),
+            status_code=401,
+            media_type="application/json"
+        )
+
+    def preserialized():
+        return Response(content=body, status_code=401, media_type="application/json")
+
+    return {
+        "model_dump_json_us": per_call_us(per_request, iterations),
+        "preserialized_us": per_call_us(preserialized, iterations)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,100,1000", help="tamanhos de listagem separados por vírgula")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+
+    emit({
+        "list": [bench_list(int(size), args.iterations) for size in args.sizes.split(",")],
+        "error_401": bench_error(args.iterations * 10)
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
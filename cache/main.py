@@ -1,17 +1,55 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-import redis
+# Primeiro import: cada bloco abaixo entra em slowest_imports do relatório de inicialização
+from startup import startup_report, readiness
 import json
 import os
-from typing import TypeVar, Generic, Optional, Any
-from pydantic import BaseModel
+import math
+import random
+import time
+import uuid
+import hmac
+import threading
+import posixpath
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar, Generic, Optional, Any, Dict, List, Callable, Tuple
+from urllib.parse import unquote, urlsplit
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+with startup_report.timed_import("fastapi"):
+    from fastapi import FastAPI, HTTPException, Header
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from pydantic import BaseModel
+with startup_report.timed_import("redis"):
+    import redis
+with startup_report.timed_import("structured_logging"):
+    from structured_logging import configure_logging, request_logger, logging_stats
+with startup_report.timed_import("stats"):
+    from stats import CacheStats, CachedInfo
+
+# Configurar logging (JSON em fila, gravado por uma thread)
+configure_logging("cache")
 logger = logging.getLogger(__name__)
+# Logs por requisição, amostrados por LOG_REQUEST_SAMPLE_RATE
+request_log = request_logger("cache.requests")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O Redis é conferido aqui, não no import; sem ele o serviço sobe e /pronto responde 503
+    with startup_report.phase("redis"):
+        if redis_ping():
+            logger.info("Conectado ao Redis em %s:%s", REDIS_HOST, REDIS_PORT)
+    stop_events = threading.Event()
+    if ITEM_EVENTS_REDIS_URL:
+        threading.Thread(target=consume_item_events, args=(stop_events,), daemon=True, name="item-events").start()
+    startup_report.mark_ready()
+    logger.info("Cache pronto: %s", json.dumps(startup_report.to_dict()))
+    yield
+    stop_events.set()
+    refresh_executor.shutdown(wait=False)
 
-app = FastAPI(title="Cache Service")
+# Respostas serializadas com orjson
+app = FastAPI(title="Cache Service", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,29 +70,317 @@ class CacheItem(BaseModel):
     key: str
     value: Any
     ttl: int = 3600  # 1 hora por padrão
+    namespace: Optional[str] = None
+    tags: List[str] = []
+
+class CacheLoadRequest(BaseModel):
+    key: str
+    source: str  # nome de uma origem de CACHE_SOURCES
+    path: str = "/"  # caminho consultado (GET) na origem quando a chave precisa ser recalculada
+    params: Dict[str, str] = {}
+    ttl: int = 3600
+    stale_ttl: int = 60  # janela em que o valor vencido ainda é servido
+    beta: float = 1.0  # agressividade da expiração antecipada (XFetch)
+    lock_timeout_ms: int = 5000
+    namespace: Optional[str] = None
+    tags: List[str] = []
 
 # Configuração do Redis
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 
-try:
-    redis_client = redis.Redis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        decode_responses=True
+# Origens que o /cache/load pode consultar ("nome=url_base", separadas por vírgula).
+# O cliente escolhe só o nome e um caminho; nunca a URL nem os cabeçalhos
+CACHE_SOURCES = {
+    name.strip(): url.strip().rstrip("/")
+    for name, _, url in (
+        entry.partition("=") for entry in os.getenv("CACHE_SOURCES", "").split(",") if entry.strip()
+    )
+}
+CACHE_SOURCE_TIMEOUT = float(os.getenv("CACHE_SOURCE_TIMEOUT", "10"))
+# Exigido no cabeçalho X-Cache-Token do /cache/load; vazio desativa o endpoint
+CACHE_LOAD_TOKEN = os.getenv("CACHE_LOAD_TOKEN")
+# Eventos de alteração publicados pelos servidores: cada um invalida as tags de ITEM_EVENT_TAGS
+# ("{item_id}" é trocado pelo id do item alterado)
+ITEM_EVENTS_REDIS_URL = os.getenv("ITEM_EVENTS_REDIS_URL")
+ITEM_EVENTS_STREAM = os.getenv("ITEM_EVENTS_STREAM", "itens:eventos")
+ITEM_EVENT_TAGS = [t.strip() for t in os.getenv("ITEM_EVENT_TAGS", "itens,item:{item_id}").split(",") if t.strip()]
+
+# Estatísticas mantidas pelo próprio serviço; o INFO do Redis é renovado só a cada intervalo
+stats = CacheStats(top_k=int(os.getenv("CACHE_HOT_KEYS", "20")))
+redis_info = CachedInfo(interval=float(os.getenv("CACHE_INFO_INTERVAL", "30")))
+
+# A conexão só é aberta no primeiro comando; se o Redis cair, o pool reconecta
+redis_client = redis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    decode_responses=True
+)
+
+def redis_ping() -> bool:
+    try:
+        return bool(redis_client.ping())
+    except Exception as e:
+        logger.error("Erro ao conectar com Redis: %s", e)
+        return False
+
+# Cache-aside: metadados e locks ficam em chaves auxiliares
+META_PREFIX = "_meta:"
+LOCK_PREFIX = "_lock:"
+# Invalidação: geração por namespace, conjunto de chaves por tag e tags de cada chave
+NAMESPACE_PREFIX = "_ns:"
+TAG_PREFIX = "_tag:"
+KEY_TAGS_PREFIX = "_keytags:"
+LOCK_POLL_INTERVAL = 0.05
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+EXTEND_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+refresh_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CACHE_REFRESH_WORKERS", "4")),
+    thread_name_prefix="cache-refresh"
+)
+
+def decode_value(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+def namespaced_key(key: str, namespace: Optional[str] = None) -> str:
+    """Prefixa a chave com a geração atual do namespace"""
+    if not namespace:
+        return key
+    generation = redis_client.get(f"{NAMESPACE_PREFIX}{namespace}") or "0"
+    return f"{namespace}:{generation}:{key}"
+
+def add_tags(pipe, key: str, tags: List[str], ttl: int):
+    """Registra a chave nos conjuntos das tags, que vivem pelo menos tanto quanto ela"""
+    for tag in tags:
+        tag_key = f"{TAG_PREFIX}{tag}"
+        pipe.sadd(tag_key, key)
+        pipe.expire(tag_key, ttl, nx=True)
+        pipe.expire(tag_key, ttl, gt=True)
+    if tags:
+        # Índice reverso com o TTL da chave: permite tirá-la das tags ao apagá-la
+        pipe.sadd(f"{KEY_TAGS_PREFIX}{key}", *tags)
+        pipe.expire(f"{KEY_TAGS_PREFIX}{key}", ttl)
+
+def remove_keys(keys: List[str], skip_tag: Optional[str] = None) -> int:
+    """Apaga as chaves com metadados e as tira dos conjuntos das suas tags"""
+    deleted = 0
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        pipe = redis_client.pipeline()
+        for key in chunk:
+            pipe.smembers(f"{KEY_TAGS_PREFIX}{key}")
+        key_tags = pipe.execute()
+        pipe = redis_client.pipeline()
+        pipe.unlink(*chunk)
+        pipe.unlink(*[f"{META_PREFIX}{k}" for k in chunk], *[f"{KEY_TAGS_PREFIX}{k}" for k in chunk])
+        for key, tags in zip(chunk, key_tags):
+            for tag in tags:
+                if tag != skip_tag:
+                    pipe.srem(f"{TAG_PREFIX}{tag}", key)
+        deleted += pipe.execute()[0]
+    return deleted
+
+def drop_tag(tag: str) -> int:
+    """O(chaves marcadas): remove as chaves da tag (e das suas outras tags) e o próprio conjunto"""
+    tag_key = f"{TAG_PREFIX}{tag}"
+    with stats.timed("invalidate"):
+        keys = list(redis_client.smembers(tag_key))
+        remove_keys(keys, skip_tag=tag)
+        redis_client.unlink(tag_key)
+    stats.incr("deletes", len(keys))
+    return len(keys)
+
+def consume_item_events(stop: threading.Event):
+    """Invalida as entradas de itens a cada escrita em /itens, em qualquer servidor"""
+    client = redis.Redis.from_url(ITEM_EVENTS_REDIS_URL, decode_responses=True)
+    # Só o que chegar daqui em diante; entradas anteriores ao startup vencem pelo TTL
+    last_id = "$"
+    while not stop.is_set():
+        try:
+            entries = client.xread({ITEM_EVENTS_STREAM: last_id}, count=500, block=1000)
+            tags = set()
+            for _, messages in entries:
+                for message_id, fields in messages:
+                    last_id = message_id
+                    tags.update(tag.replace("{item_id}", fields["item_id"]) for tag in ITEM_EVENT_TAGS)
+            if tags:
+                removed = sum(drop_tag(tag) for tag in tags)
+                request_log.info("Eventos de itens: %d tags, %d chaves invalidadas", len(tags), removed)
+        except Exception as e:
+            logger.error("Erro ao consumir eventos de itens: %s", e)
+            stop.wait(1)
+
+def acquire_lock(key: str, timeout_ms: int) -> Optional[str]:
+    """Tenta obter o lock distribuído da chave (SET NX PX)"""
+    token = uuid.uuid4().hex
+    if redis_client.set(f"{LOCK_PREFIX}{key}", token, nx=True, px=timeout_ms):
+        return token
+    return None
+
+def release_lock(key: str, token: str):
+    """Libera o lock apenas se ele ainda pertencer a este token"""
+    redis_client.eval(RELEASE_LOCK_SCRIPT, 1, f"{LOCK_PREFIX}{key}", token)
+
+class LockRenewal:
+    """Renova o lock enquanto o loader roda: um loader lento não perde o lock para outro"""
+
+    def __init__(self, key: str, token: str, timeout_ms: int):
+        self.key = key
+        self.token = token
+        self.timeout_ms = timeout_ms
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cache-lock-renewal", daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.timeout_ms / 3000):
+            try:
+                if not redis_client.eval(EXTEND_LOCK_SCRIPT, 1, f"{LOCK_PREFIX}{self.key}", self.token, self.timeout_ms):
+                    return
+            except Exception as e:
+                logger.error("Erro ao renovar o lock de %s: %s", self.key, e)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+
+def should_recompute(meta: dict, beta: float, now: float) -> bool:
+    """Expiração probabilística antecipada (XFetch)"""
+    # 1 - random() fica em (0, 1], evitando log(0)
+    return now - meta["delta"] * beta * math.log(1.0 - random.random()) >= meta["expiry"]
+
+def compute_and_store(key: str, loader: Callable[[], Any], ttl: int, stale_ttl: int,
+                      tags: Optional[List[str]] = None) -> Any:
+    tags = tags or []
+    start = time.time()
+    value = loader()
+    delta = time.time() - start
+    # A chave física vive ttl + stale_ttl; a expiração lógica fica nos metadados
+    value_json = json.dumps(value)
+    pipe = redis_client.pipeline()
+    pipe.set(key, value_json, ex=ttl + stale_ttl)
+    pipe.set(
+        f"{META_PREFIX}{key}",
+        json.dumps({"delta": delta, "expiry": start + delta + ttl}),
+        ex=ttl + stale_ttl
     )
-    # Testar conexão
-    redis_client.ping()
-    logger.info(f"Conectado ao Redis em {REDIS_HOST}:{REDIS_PORT}")
-except Exception as e:
-    logger.error(f"Erro ao conectar com Redis: {e}")
-    redis_client = None
+    add_tags(pipe, key, tags, ttl + stale_ttl)
+    pipe.execute()
+    stats.incr("sets")
+    stats.incr("bytes_in", len(value_json))
+    return value
+
+def refresh_in_background(key: str, loader: Callable[[], Any], ttl: int, stale_ttl: int, tags: List[str], token: str,
+                          lock_timeout_ms: int):
+    try:
+        with LockRenewal(key, token, lock_timeout_ms):
+            compute_and_store(key, loader, ttl, stale_ttl, tags)
+        request_log.info("Cache revalidado: %s", key)
+    except Exception as e:
+        logger.error("Erro ao revalidar cache %s: %s", key, e)
+    finally:
+        release_lock(key, token)
+
+def get_or_load(
+    key: str,
+    loader: Callable[[], Any],
+    ttl: int = 3600,
+    stale_ttl: int = 60,
+    beta: float = 1.0,
+    lock_timeout_ms: int = 5000,
+    tags: Optional[List[str]] = None,
+    loader_timeout_ms: int = 0
+) -> Tuple[Any, str]:
+    """Cache-aside com proteção contra stampede.
+
+    Apenas quem obtém o lock da chave executa o loader. Valores vencidos
+    (dentro de stale_ttl) ou sorteados pelo XFetch continuam sendo servidos
+    enquanto uma única revalidação roda em background.
+    O lock é renovado enquanto o loader roda, e quem espera aguarda pelo menos
+    `loader_timeout_ms` antes de desistir e carregar por conta própria.
+    Retorna (valor, estado), com estado "hit", "stale" ou "miss".
+    """
+    tags = tags or []
+    deadline = time.time() + max(lock_timeout_ms, loader_timeout_ms) / 1000
+    while True:
+        now = time.time()
+        raw, raw_meta = redis_client.mget(key, f"{META_PREFIX}{key}")
+        if raw is not None:
+            value = decode_value(raw)
+            if raw_meta is None:
+                # Chave gravada por /cache/set, sem metadados de expiração
+                return value, "hit"
+            meta = json.loads(raw_meta)
+            if not should_recompute(meta, beta, now):
+                return value, "hit"
+            token = acquire_lock(key, lock_timeout_ms)
+            if token:
+                refresh_executor.submit(refresh_in_background, key, loader, ttl, stale_ttl, tags, token, lock_timeout_ms)
+            return value, "stale" if now >= meta["expiry"] else "hit"
+
+        token = acquire_lock(key, lock_timeout_ms)
+        if token:
+            try:
+                with LockRenewal(key, token, lock_timeout_ms):
+                    return compute_and_store(key, loader, ttl, stale_ttl, tags), "miss"
+            finally:
+                release_lock(key, token)
+
+        if time.time() >= deadline:
+            # O dono do lock não concluiu a tempo: calcula sem gravar
+            logger.warning("Timeout aguardando lock de %s, carregando diretamente", key)
+            return loader(), "miss"
+        time.sleep(LOCK_POLL_INTERVAL)
+
+def source_url(source: str, path: str) -> str:
+    """URL de um caminho dentro de uma origem permitida; ValueError fora da allowlist"""
+    base = CACHE_SOURCES.get(source)
+    if base is None:
+        raise ValueError(f"Origem desconhecida: {source}")
+    # Validado já decodificado, como o servidor de origem vai interpretar: "%2e%2e/" é "../".
+    # Codificação dupla ("%252e") é recusada, porque a origem poderia decodificar de novo
+    decoded = unquote(path)
+    if decoded != unquote(decoded):
+        raise ValueError(f"Caminho inválido: {path}")
+    # Só caminhos relativos à base: sem "..", outro host ("//", "@") ou query/fragmento no caminho
+    if not decoded.startswith("/") or any(part in decoded for part in ("..", "//", "\\", "@", "?", "#")):
+        raise ValueError(f"Caminho inválido: {path}")
+    base_path = urlsplit(base).path
+    normalized = posixpath.normpath(base_path + decoded)
+    if normalized != base_path and not normalized.startswith(base_path + "/"):
+        raise ValueError(f"Caminho inválido: {path}")
+    return base + path
+
+def fetch_source(url: str, params: Dict[str, str]) -> Any:
+    # Importado só no primeiro /cache/load: fora do caminho do startup
+    import requests
+
+    # Sem redirecionamentos: o destino final fica dentro da origem permitida
+    response = requests.get(url, params=params, timeout=CACHE_SOURCE_TIMEOUT, allow_redirects=False)
+    response.raise_for_status()
+    return response.json()
 
 @app.get("/saude")
 def saude():
-    redis_status = "conectado" if redis_client and redis_client.ping() else "desconectado"
+    redis_status = "conectado" if redis_ping() else "desconectado"
     return ResponseModel(
         status="success",
         data={
@@ -62,10 +388,20 @@ def saude():
             "servico": "cache-service",
             "redis": redis_status,
             "host": REDIS_HOST,
-            "port": REDIS_PORT
+            "port": REDIS_PORT,
+            "logging": logging_stats()
         }
     )
 
+@app.get("/pronto")
+def pronto():
+    """Readiness: startup concluído e Redis respondendo (/saude é só liveness)"""
+    status_code, data = readiness({"startup": startup_report.ready, "redis": redis_ping()})
+    return ORJSONResponse(
+        status_code=status_code,
+        content=ResponseModel(status="success" if status_code == 200 else "error", data=data).model_dump()
+    )
+
 @app.post("/cache/set")
 def set_cache(item: CacheItem):
     try:
@@ -77,23 +413,30 @@ def set_cache(item: CacheItem):
         
         # Serializar o valor para JSON
         value_json = json.dumps(item.value)
-        redis_client.setex(item.key, item.ttl, value_json)
+        with stats.timed("set"):
+            key = namespaced_key(item.key, item.namespace)
+            pipe = redis_client.pipeline()
+            pipe.setex(key, item.ttl, value_json)
+            add_tags(pipe, key, item.tags, item.ttl)
+            pipe.execute()
+        stats.incr("sets")
+        stats.incr("bytes_in", len(value_json))
         
-        logger.info(f"Cache definido: {item.key} (TTL: {item.ttl}s)")
+        request_log.info("Cache definido: %s (TTL: %ss)", item.key, item.ttl)
         
         return ResponseModel(
             status="success",
             message=f"Cache definido com sucesso para a chave: {item.key}"
         )
     except Exception as e:
-        logger.error(f"Erro ao definir cache: {e}")
+        logger.error("Erro ao definir cache: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
         )
 
 @app.get("/cache/get/{key}")
-def get_cache(key: str):
+def get_cache(key: str, namespace: Optional[str] = None):
     try:
         if not redis_client:
             return ResponseModel(
@@ -101,7 +444,9 @@ def get_cache(key: str):
                 message="Redis não está disponível"
             )
         
-        value = redis_client.get(key)
+        with stats.timed("get"):
+            value = redis_client.get(namespaced_key(key, namespace))
+        stats.access(key, hit=value is not None, bytes_out=len(value) if value else 0)
         if value is None:
             return ResponseModel(
                 status="error",
@@ -109,12 +454,9 @@ def get_cache(key: str):
             )
         
         # Deserializar o valor JSON
-        try:
-            value_data = json.loads(value)
-        except json.JSONDecodeError:
-            value_data = value
+        value_data = decode_value(value)
         
-        logger.info(f"Cache recuperado: {key}")
+        request_log.info("Cache recuperado: %s", key)
         
         return ResponseModel(
             status="success",
@@ -124,14 +466,63 @@ def get_cache(key: str):
             }
         )
     except Exception as e:
-        logger.error(f"Erro ao recuperar cache: {e}")
+        logger.error("Erro ao recuperar cache: %s", e)
+        return ResponseModel(
+            status="error",
+            message=str(e)
+        )
+
+@app.post("/cache/load")
+def load_cache(req: CacheLoadRequest, x_cache_token: Optional[str] = Header(None)):
+    # Consulta origens da rede interna: fechado sem CACHE_LOAD_TOKEN
+    if not CACHE_LOAD_TOKEN:
+        raise HTTPException(status_code=503, detail="Carga desativada: defina CACHE_LOAD_TOKEN")
+    if not x_cache_token or not hmac.compare_digest(x_cache_token, CACHE_LOAD_TOKEN):
+        raise HTTPException(status_code=403, detail="Token inválido")
+    try:
+        url = source_url(req.source, req.path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        if not redis_client:
+            return ResponseModel(
+                status="error",
+                message="Redis não está disponível"
+            )
+        
+        with stats.timed("load"):
+            value, state = get_or_load(
+                namespaced_key(req.key, req.namespace),
+                lambda: fetch_source(url, req.params),
+                ttl=req.ttl,
+                stale_ttl=req.stale_ttl,
+                beta=req.beta,
+                lock_timeout_ms=req.lock_timeout_ms,
+                tags=req.tags,
+                # requests aplica o timeout por operação (conexão e cada leitura): margem de 2x
+                loader_timeout_ms=int(CACHE_SOURCE_TIMEOUT * 2000)
+            )
+        stats.access(req.key, hit=state != "miss", stale=state == "stale")
+        
+        request_log.info("Cache carregado: %s (%s)", req.key, state)
+        
+        return ResponseModel(
+            status="success",
+            data={
+                "key": req.key,
+                "value": value,
+                "cache": state
+            }
+        )
+    except Exception as e:
+        logger.error("Erro ao carregar cache: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
         )
 
 @app.delete("/cache/delete/{key}")
-def delete_cache(key: str):
+def delete_cache(key: str, namespace: Optional[str] = None):
     try:
         if not redis_client:
             return ResponseModel(
@@ -139,21 +530,23 @@ def delete_cache(key: str):
                 message="Redis não está disponível"
             )
         
-        result = redis_client.delete(key)
+        with stats.timed("delete"):
+            result = remove_keys([namespaced_key(key, namespace)])
+        stats.incr("deletes", result)
         if result == 0:
             return ResponseModel(
                 status="error",
                 message=f"Chave não encontrada: {key}"
             )
         
-        logger.info(f"Cache deletado: {key}")
+        request_log.info("Cache deletado: %s", key)
         
         return ResponseModel(
             status="success",
             message=f"Cache deletado com sucesso: {key}"
         )
     except Exception as e:
-        logger.error(f"Erro ao deletar cache: {e}")
+        logger.error("Erro ao deletar cache: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
@@ -179,7 +572,7 @@ def list_keys(pattern: str = "*"):
             }
         )
     except Exception as e:
-        logger.error(f"Erro ao listar chaves: {e}")
+        logger.error("Erro ao listar chaves: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
@@ -203,7 +596,62 @@ def flush_cache():
             message="Cache limpo com sucesso"
         )
     except Exception as e:
-        logger.error(f"Erro ao limpar cache: {e}")
+        logger.error("Erro ao limpar cache: %s", e)
+        return ResponseModel(
+            status="error",
+            message=str(e)
+        )
+
+@app.post("/cache/invalidate/tag/{tag}")
+def invalidate_tag(tag: str):
+    try:
+        if not redis_client:
+            return ResponseModel(
+                status="error",
+                message="Redis não está disponível"
+            )
+        
+        invalidated = drop_tag(tag)
+        logger.info("Cache invalidado por tag: %s (%s chaves)", tag, invalidated)
+        
+        return ResponseModel(
+            status="success",
+            data={
+                "tag": tag,
+                "invalidated": invalidated
+            }
+        )
+    except Exception as e:
+        logger.error("Erro ao invalidar tag: %s", e)
+        return ResponseModel(
+            status="error",
+            message=str(e)
+        )
+
+@app.post("/cache/invalidate/namespace/{namespace}")
+def invalidate_namespace(namespace: str):
+    try:
+        if not redis_client:
+            return ResponseModel(
+                status="error",
+                message="Redis não está disponível"
+            )
+        
+        # O(1): as chaves da geração anterior deixam de ser lidas e expiram pelo TTL
+        with stats.timed("invalidate"):
+            generation = redis_client.incr(f"{NAMESPACE_PREFIX}{namespace}")
+        
+        logger.info("Namespace invalidado: %s (geração %s)", namespace, generation)
+        
+        return ResponseModel(
+            status="success",
+            data={
+                "namespace": namespace,
+                "generation": generation
+            }
+        )
+    except Exception as e:
+        logger.error("Erro ao invalidar namespace: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
@@ -218,7 +666,7 @@ def cache_stats():
                 message="Redis não está disponível"
             )
         
-        info = redis_client.info()
+        info = redis_info.get(redis_client.info)
         
         return ResponseModel(
             status="success",
@@ -226,12 +674,16 @@ def cache_stats():
                 "total_keys": info.get("db0", {}).get("keys", 0),
                 "used_memory": info.get("used_memory_human", "N/A"),
                 "connected_clients": info.get("connected_clients", 0),
-                "uptime": info.get("uptime_in_seconds", 0)
+                "uptime": info.get("uptime_in_seconds", 0),
+                "service": stats.snapshot()
             }
         )
     except Exception as e:
-        logger.error(f"Erro ao obter estatísticas: {e}")
+        logger.error("Erro ao obter estatísticas: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
-        ) 
\ No newline at end of file
+        )
+
+# Fim do import do módulo; o restante do startup é medido no lifespan
+startup_report.imports_finished()
@@ -0,0 +1,189 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Limites superiores (ms) dos buckets de latência
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+
+class LatencyHistogram:
+    """Histograma de latência com buckets fixos (memória constante)"""
+
+    def __init__(self, buckets_ms: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        index = len(self.buckets_ms)
+        for i, limit in enumerate(self.buckets_ms):
+            if ms <= limit:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Aproxima o percentil pelo limite superior do bucket"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self.buckets_ms[i], self.max_ms) if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": {
+                **{f"le_{b}": c for b, c in zip(self.buckets_ms, self.counts)},
+                "le_inf": self.counts[-1]
+            }
+        }
+
+
+class HotKeySketch:
+    """Top-K de chaves mais acessadas com Count-Min Sketch + heap"""
+
+    def __init__(self, k: int = 20, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self.table = [[0] * width for _ in range(depth)]
+        self.top: Dict[str, int] = {}
+        self.heap: List[tuple] = []  # (contagem, chave), pode conter entradas obsoletas
+
+    def _indexes(self, key: str):
+        h1 = hash(key)
+        h2 = (h1 >> 16) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str):
+        estimate = None
+        for row, index in zip(self.table, self._indexes(key)):
+            row[index] += 1
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+
+        if key in self.top:
+            self.top[key] = estimate
+            heapq.heappush(self.heap, (estimate, key))
+        elif len(self.top) < self.k:
+            self.top[key] = estimate
+            heapq.heappush(self.heap, (estimate, key))
+        else:
+            self._discard_stale()
+            if estimate > self.heap[0][0]:
+                _, evicted = heapq.heappop(self.heap)
+                del self.top[evicted]
+                self.top[key] = estimate
+                heapq.heappush(self.heap, (estimate, key))
+
+        if len(self.heap) > 4 * self.k:
+            self.heap = [(c, k) for k, c in self.top.items()]
+            heapq.heapify(self.heap)
+
+    def _discard_stale(self):
+        while self.heap:
+            count, key = self.heap[0]
+            if self.top.get(key) == count:
+                return
+            heapq.heappop(self.heap)
+
+    def top_keys(self) -> List[dict]:
+        ranked = sorted(self.top.items(), key=lambda kv: kv[1], reverse=True)
+        return [{"key": k, "estimated_hits": c} for k, c in ranked]
+
+
+class CacheStats:
+    """Contadores do serviço de cache, atualizados em memória a cada operação"""
+
+    def __init__(self, top_k: int = 20):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "stale_hits": 0,
+            "sets": 0,
+            "deletes": 0,
+            "errors": 0,
+            "bytes_in": 0,
+            "bytes_out": 0
+        }
+        self.latencies: Dict[str, LatencyHistogram] = {}
+        self.hot_keys = HotKeySketch(k=top_k)
+
+    def incr(self, counter: str, amount: int = 1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def access(self, key: str, hit: bool, stale: bool = False, bytes_out: int = 0):
+        with self.lock:
+            if hit:
+                self.counters["stale_hits" if stale else "hits"] += 1
+            else:
+                self.counters["misses"] += 1
+            self.counters["bytes_out"] += bytes_out
+            self.hot_keys.add(key)
+
+    @contextmanager
+    def timed(self, operation: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr("errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                histogram = self.latencies.get(operation)
+                if histogram is None:
+                    histogram = self.latencies[operation] = LatencyHistogram()
+                histogram.observe(elapsed)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+            return {
+                **counters,
+                "hit_rate": (counters["hits"] + counters["stale_hits"]) / lookups if lookups else 0.0,
+                "latency": {op: h.snapshot() for op, h in self.latencies.items()},
+                "hot_keys": self.hot_keys.top_keys(),
+                "since": self.started_at
+            }
+
+
+class CachedInfo:
+    """Mantém o último INFO do Redis e só o renova após `interval` segundos"""
+
+    def __init__(self, interval: float = 30.0):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.value: Optional[dict] = None
+        self.fetched_at = 0.0
+
+    def get(self, fetch) -> dict:
+        now = time.time()
+        with self.lock:
+            if self.value is None or now - self.fetched_at >= self.interval:
+                self.value = fetch()
+                self.fetched_at = now
+            return self.value
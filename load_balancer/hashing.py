@@ -0,0 +1,89 @@
+import bisect
+import hashlib
+import math
+import re
+from typing import Dict, List, Optional
+
+from registry import Backend
+
+# Primeiro segmento numérico/identificador após a coleção: /itens/42 -> "itens/42"
+RESOURCE_ID = re.compile(r"^/([^/]+)/([^/?]+)")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Anel de hash consistente com nós virtuais proporcionais ao peso.
+
+    Com cargas limitadas (Mirrokni et al.), um servidor só recebe a chave se
+    tiver menos de ceil(c * média) requisições em andamento; caso contrário a
+    busca continua no próximo ponto do anel. Mudanças no conjunto de
+    servidores remapeiam apenas as chaves dos pontos afetados.
+    """
+
+    def __init__(self, vnodes: int = 100, load_factor: float = 1.25):
+        self.vnodes = vnodes
+        self.load_factor = load_factor
+        self.points: List[int] = []
+        self.owners: List[str] = []
+        self.signature = None
+
+    def rebuild(self, backends: List[Backend]):
+        signature = tuple((b.url, b.weight) for b in backends)
+        if signature == self.signature:
+            return
+        ring = []
+        for backend in backends:
+            for i in range(self.vnodes * backend.weight):
+                ring.append((_hash(f"{backend.url}#{i}"), backend.url))
+        ring.sort()
+        self.points = [p for p, _ in ring]
+        self.owners = [u for _, u in ring]
+        self.signature = signature
+
+    def select(self, key: str, backends: List[Backend]) -> Optional[Backend]:
+        if not backends:
+            return None
+        self.rebuild(backends)
+        by_url: Dict[str, Backend] = {b.url: b for b in backends}
+        total_inflight = sum(b.inflight for b in backends) + 1
+        capacity = math.ceil(self.load_factor * total_inflight / len(backends))
+
+        start = bisect.bisect(self.points, _hash(key)) % len(self.points)
+        seen = set()
+        for offset in range(len(self.points)):
+            url = self.owners[(start + offset) % len(self.points)]
+            if url in seen:
+                continue
+            seen.add(url)
+            backend = by_url[url]
+            if backend.inflight < capacity:
+                return backend
+            if len(seen) == len(by_url):
+                break
+        return by_url[self.owners[start]]
+
+
+def routing_key(source: str, path: str, headers) -> Optional[str]:
+    """Extrai a chave de afinidade: "path" (id do recurso), "header:<nome>" ou "user" (sub do JWT)"""
+    if source == "path":
+        match = RESOURCE_ID.match(path)
+        return f"{match.group(1)}/{match.group(2)}" if match else None
+    if source.startswith("header:"):
+        return headers.get(source.split(":", 1)[1])
+    if source == "user":
+        authorization = headers.get("authorization", "")
+        if not authorization.startswith("Bearer "):
+            return None
+        # PyJWT só é importado com HASH_KEY=user
+        import jwt
+
+        try:
+            # Só para escolher o servidor; a assinatura é validada no gateway (ou via JWKS)
+            payload = jwt.decode(authorization[7:], options={"verify_signature": False})
+        except jwt.PyJWTError:
+            return None
+        return payload.get("sub")
+    return None
@@ -1,17 +1,52 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
+# Primeiro import: cada bloco abaixo entra em slowest_imports do relatório de inicialização
+from startup import startup_report, readiness
 import os
-import requests
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
 from typing import Optional, Any
-from pydantic import BaseModel
-from starlette.responses import Response
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+with startup_report.timed_import("fastapi"):
+    from fastapi import FastAPI, Request, Header, HTTPException
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from pydantic import BaseModel
+    from starlette.responses import Response, StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+with startup_report.timed_import("orjson"):
+    import orjson
+with startup_report.timed_import("structured_logging"):
+    from structured_logging import configure_logging, request_logger, logging_stats
+with startup_report.timed_import("upstream"):
+    from upstream import create_client, forward_headers, response_headers, relay
+with startup_report.timed_import("modulos do load balancer"):
+    from registry import BackendRegistry, parse_backends, watch_backends_file
+    from hashing import ConsistentHashRing, routing_key
+    from tracing import tracer_from_env, TRACEPARENT
+
+# Configurar logging (JSON em fila, gravado por uma thread)
+configure_logging("load-balancer")
 logger = logging.getLogger(__name__)
+# Logs por requisição, amostrados por LOG_REQUEST_SAMPLE_RATE
+request_log = request_logger("load_balancer.requests")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    backends_watch = None
+    if SERVIDORES_FILE:
+        backends_watch = asyncio.create_task(
+            watch_backends_file(registry, SERVIDORES_FILE, SERVIDORES_FILE_INTERVAL, logger)
+        )
+    startup_report.mark_ready()
+    logger.info("Load Balancer pronto: %s", orjson.dumps(startup_report.to_dict()).decode())
+    yield
+    if backends_watch is not None:
+        backends_watch.cancel()
+    await registry.close()
 
-app = FastAPI(title="Load Balancer")
+# Respostas serializadas com orjson
+app = FastAPI(title="Load Balancer", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,11 +61,74 @@ class ResponseModel(BaseModel):
     data: Optional[Any] = None
     message: Optional[str] = None
 
-# Lista de servidores para balanceamento
-SERVIDORES = os.getenv("SERVIDORES", "http://localhost:8002,http://localhost:8003").split(",")
-current_server_index = 0
+class BackendUpdate(BaseModel):
+    url: str
+    weight: int = 1
+    timeout: float = 30.0  # espera máxima pelas requisições em andamento ao drenar/remover
+
+# Corpo de erro constante, serializado uma única vez na inicialização
+NO_BACKEND_BODY = ResponseModel(status="error", message="Nenhum servidor disponível").model_dump_json().encode()
+
+# Servidores para balanceamento ("url=peso", separados por vírgula); alteráveis em tempo de execução
+SERVIDORES = os.getenv("SERVIDORES", "http://localhost:8002,http://localhost:8003")
+
+# Pool de conexões keep-alive por servidor (HTTP/2 opcional, requer httpx[http2])
+def upstream_client(url: str):
+    return create_client(
+        url,
+        max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+        max_keepalive=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+        timeout=float(os.getenv("UPSTREAM_TIMEOUT", "30")),
+        http2=os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+    )
+
+registry = BackendRegistry(parse_backends(SERVIDORES), client_factory=upstream_client)
+
+# Rotas repassadas em streaming, pedaço a pedaço, sem juntar o corpo em memória
+STREAMING_PATHS = {p.strip() for p in os.getenv("STREAMING_PATHS", "/itens/export").split(",") if p.strip()}
+
+# Modo de roteamento: round_robin ou consistent_hash (afinidade por recurso, cabeçalho ou usuário)
+ROUTING_MODE = os.getenv("ROUTING_MODE", "round_robin")
+HASH_KEY = os.getenv("HASH_KEY", "path")  # path | header:<nome> | user
+hash_ring = ConsistentHashRing(
+    vnodes=int(os.getenv("HASH_VNODES", "100")),
+    load_factor=float(os.getenv("HASH_LOAD_FACTOR", "1.25"))
+)
+
+def select_backend(request: Request):
+    if ROUTING_MODE == "consistent_hash":
+        key = routing_key(HASH_KEY, request.url.path, request.headers)
+        if key is not None:
+            return hash_ring.select(key, registry.active())
+    # Sem chave de afinidade (ex.: listagem) cai no round-robin ponderado
+    return registry.select()
+
+# Arquivo opcional com a lista de servidores, recarregado quando muda
+SERVIDORES_FILE = os.getenv("SERVIDORES_FILE")
+SERVIDORES_FILE_INTERVAL = float(os.getenv("SERVIDORES_FILE_INTERVAL", "2"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Validação local dos tokens com as chaves públicas do gateway (opcional)
+JWKS_URL = os.getenv("JWKS_URL")
+token_verifier = None
+if JWKS_URL:
+    # PyJWT só é importado quando a validação local está ativa
+    import jwt
+    from token_verifier import TokenVerifier, bearer_token
+    token_verifier = TokenVerifier(JWKS_URL, cache_ttl=int(os.getenv("JWKS_CACHE_TTL", "300")))
+
+# Tracing distribuído: continua o trace do gateway (traceparent) até os servidores
+tracer = tracer_from_env("load-balancer")
 
-logger.info(f"Load Balancer iniciado com servidores: {SERVIDORES}")
+logger.info("Load Balancer iniciado com servidores: %s", registry.urls())
+
+def check_admin(token: Optional[str]):
+    # Sem ADMIN_TOKEN a administração fica fechada: ninguém altera os servidores
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Administração desativada: defina ADMIN_TOKEN")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de administração inválido")
 
 @app.get("/saude")
 def saude():
@@ -39,56 +137,170 @@ def saude():
         data={
             "status": "saudavel",
             "servico": "load-balancer",
-            "servidores": SERVIDORES,
-            "servidor_atual": current_server_index
+            "servidores": registry.urls(),
+            "backends": registry.snapshot(),
+            "routing": ROUTING_MODE,
+            "logging": logging_stats()
         }
     )
 
+@app.get("/pronto")
+def pronto():
+    """Readiness: startup concluído e ao menos um servidor ativo (/saude é só liveness)"""
+    status_code, data = readiness({"startup": startup_report.ready, "backends": bool(registry.active())})
+    return ORJSONResponse(
+        status_code=status_code,
+        content=ResponseModel(status="success" if status_code == 200 else "error", data=data).model_dump()
+    )
+
+@app.get("/admin/backends")
+def listar_backends(x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    return ResponseModel(status="success", data=registry.snapshot())
+
+@app.post("/admin/backends")
+def adicionar_backend(backend: BackendUpdate, x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    added = registry.add(backend.url, backend.weight)
+    logger.info("Servidor adicionado: %s (peso %s)", added.url, added.weight)
+    return ResponseModel(status="success", data=added.to_dict())
+
+@app.put("/admin/backends/weight")
+def alterar_peso(backend: BackendUpdate, x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    updated = registry.set_weight(backend.url, backend.weight)
+    if updated is None:
+        return ResponseModel(status="error", message=f"Servidor não encontrado: {backend.url}")
+    return ResponseModel(status="success", data=updated.to_dict())
+
+@app.post("/admin/backends/drain")
+async def drenar_backend(backend: BackendUpdate, x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    if backend.url.rstrip("/") not in registry.backends:
+        return ResponseModel(status="error", message=f"Servidor não encontrado: {backend.url}")
+    drained = await registry.drain(backend.url, backend.timeout)
+    logger.info("Servidor drenado: %s (concluído: %s)", backend.url, drained)
+    return ResponseModel(
+        status="success" if drained else "error",
+        data=registry.backends[backend.url.rstrip("/")].to_dict(),
+        message=None if drained else "Timeout aguardando requisições em andamento"
+    )
+
+@app.delete("/admin/backends")
+async def remover_backend(url: str, timeout: float = 30.0, x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    if url.rstrip("/") not in registry.backends:
+        return ResponseModel(status="error", message=f"Servidor não encontrado: {url}")
+    drained = await registry.remove(url, timeout)
+    logger.info("Servidor removido: %s (drenado: %s)", url, drained)
+    return ResponseModel(
+        status="success",
+        data={"url": url, "drained": drained}
+    )
+
 @app.middleware("http")
 async def proxy_to_server(request: Request, call_next):
-    global current_server_index
-    
-    # Se for uma requisição para /saude, não fazer proxy
-    if request.url.path == "/saude":
+    # Se for uma requisição para /saude, /pronto ou administrativa, não fazer proxy
+    if request.url.path in ("/saude", "/pronto") or request.url.path.startswith("/admin/"):
         return await call_next(request)
     
+    with tracer.request_span("lb.request", request.headers.get(TRACEPARENT)) as span:
+        span.set_attribute("http.method", request.method)
+        span.set_attribute("http.path", request.url.path)
+        response = await forward_to_server(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+async def forward_to_server(request: Request) -> Response:
+    if token_verifier and request.url.path.startswith("/itens"):
+        token = bearer_token(request.headers.get("Authorization"))
+        try:
+            if not token:
+                raise jwt.InvalidTokenError("Token ausente")
+            # A busca do JWKS pode ir à rede quando o cache expira
+            with tracer.span("auth"):
+                await run_in_threadpool(token_verifier.verify, token)
+        except jwt.PyJWTError as e:
+            return Response(
+                content=ResponseModel(
+                    status="error",
+                    message=f"Token inválido: {e}"
+                ).model_dump_json(),
+                status_code=401,
+                media_type="application/json"
+            )
+    
+    # Selecionar o servidor (round-robin ponderado ou hash consistente)
+    with tracer.span("select_backend", routing=ROUTING_MODE) as selection:
+        backend = select_backend(request)
+        if selection is not None and backend is not None:
+            selection.set_attribute("backend", backend.url)
+    if backend is None:
+        return Response(
+            content=NO_BACKEND_BODY,
+            status_code=503,
+            media_type="application/json",
+            headers={"Retry-After": "1"}
+        )
+    server_url = backend.url
+    registry.acquire(backend)
+    # No streaming a requisição só termina (e libera o servidor) quando o corpo acaba
+    released_by_stream = False
+    
     try:
-        # Selecionar o próximo servidor (round-robin)
-        server_url = SERVIDORES[current_server_index]
-        current_server_index = (current_server_index + 1) % len(SERVIDORES)
-        
-        logger.info(f"Requisição {request.method} {request.url.path} -> Servidor {current_server_index}: {server_url}")
+        request_log.info("Requisição %s %s -> Servidor: %s", request.method, request.url.path, server_url)
         
-        # Construir a URL completa
-        target_url = f"{server_url}{request.url.path}"
+        # Construir a URL relativa ao servidor
+        target_url = request.url.path
         if request.url.query:
             target_url += f"?{request.url.query}"
         
-        # Fazer a requisição para o servidor
-        method = request.method
-        headers = dict(request.headers)
+        # Fazer a requisição pelo pool de conexões do servidor
         body = await request.body()
+        with tracer.span("upstream", backend=server_url):
+            client = registry.client_for(backend)
+            upstream_request = client.build_request(
+                method=request.method,
+                url=target_url,
+                headers=tracer.inject(forward_headers(request.headers, request.client.host if request.client else None)),
+                content=body
+            )
+            response = await client.send(upstream_request, stream=True)
+            if request.url.path in STREAMING_PATHS:
+                released_by_stream = True
+                return StreamingResponse(
+                    relay(response, lambda: registry.release(backend)),
+                    status_code=response.status_code,
+                    headers=response_headers(response.headers)
+                )
+            try:
+                # Bytes sem decodificar, preservando o Content-Encoding do servidor
+                content = b"".join([chunk async for chunk in response.aiter_raw()])
+            finally:
+                await response.aclose()
         
-        response = requests.request(
-            method=method,
-            url=target_url,
-            headers=headers,
-            data=body,
-            timeout=30
-        )
-        
-        logger.info(f"Resposta do servidor {server_url}: {response.status_code}")
+        request_log.info("Resposta do servidor %s: %s", server_url, response.status_code)
         
         # Retornar a resposta do servidor diretamente
         return Response(
-            content=response.content,
+            content=content,
             status_code=response.status_code,
-            headers=dict(response.headers)
+            headers=response_headers(response.headers)
         )
         
     except Exception as e:
-        logger.error(f"Erro ao conectar com servidor {server_url}: {str(e)}")
-        return ResponseModel(
-            status="error",
-            message=f"Erro ao conectar com servidor: {str(e)}"
-        ) 
\ No newline at end of file
+        logger.error("Erro ao conectar com servidor %s: %s", server_url, e)
+        return Response(
+            content=ResponseModel(
+                status="error",
+                message=f"Erro ao conectar com servidor: {str(e)}"
+            ).model_dump_json(),
+            status_code=502,
+            media_type="application/json"
+        )
+    finally:
+        if not released_by_stream:
+            registry.release(backend)
+
+# Fim do import do módulo; o restante do startup é medido no lifespan
+startup_report.imports_finished()
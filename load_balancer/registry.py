@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ACTIVE = "active"
+DRAINING = "draining"
+
+
+@dataclass
+class Backend:
+    url: str
+    weight: int = 1
+    state: str = ACTIVE
+    inflight: int = 0
+    requests: int = 0
+    current_weight: int = 0  # estado do round-robin ponderado suave
+    added_at: float = field(default_factory=time.time)
+    client: Any = None  # cliente HTTP persistente deste servidor, criado no primeiro uso
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "state": self.state,
+            "inflight": self.inflight,
+            "requests": self.requests
+        }
+
+
+def parse_backends(spec: str) -> List[Tuple[str, int]]:
+    """Converte "http://a:8002=3,http://b:8003" em [(url, peso)]"""
+    backends = []
+    for entry in spec.replace("\n", ",").split(","):
+        entry = entry.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        url, _, weight = entry.partition("=")
+        backends.append((url.strip().rstrip("/"), int(weight) if weight.strip() else 1))
+    return backends
+
+
+def read_backends_file(path: str) -> List[Tuple[str, int]]:
+    """Arquivo com um servidor por linha: "url [peso]" (linhas com # são ignoradas)"""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split()
+            entries.append(f"{parts[0]}={parts[1]}" if len(parts) > 1 else parts[0])
+    return parse_backends(",".join(entries))
+
+
+class BackendRegistry:
+    """Conjunto dinâmico de servidores com round-robin ponderado e drenagem graciosa"""
+
+    def __init__(self, backends: List[Tuple[str, int]], client_factory: Optional[Callable[[str], Any]] = None):
+        self.backends: Dict[str, Backend] = {}
+        self.client_factory = client_factory
+        for url, weight in backends:
+            self.add(url, weight)
+
+    def urls(self) -> List[str]:
+        return list(self.backends)
+
+    def active(self) -> List[Backend]:
+        return [b for b in self.backends.values() if b.state == ACTIVE and b.weight > 0]
+
+    def select(self) -> Optional[Backend]:
+        """Round-robin ponderado suave (mesmo algoritmo do nginx)"""
+        candidates = self.active()
+        if not candidates:
+            return None
+        total = 0
+        best = None
+        for backend in candidates:
+            backend.current_weight += backend.weight
+            total += backend.weight
+            if best is None or backend.current_weight > best.current_weight:
+                best = backend
+        best.current_weight -= total
+        return best
+
+    def acquire(self, backend: Backend):
+        backend.inflight += 1
+        backend.requests += 1
+
+    def release(self, backend: Backend):
+        backend.inflight -= 1
+
+    def add(self, url: str, weight: int = 1) -> Backend:
+        url = url.rstrip("/")
+        backend = self.backends.get(url)
+        if backend is None:
+            backend = self.backends[url] = Backend(url=url, weight=weight)
+        else:
+            backend.weight = weight
+            backend.state = ACTIVE
+        return backend
+
+    def client_for(self, backend: Backend) -> Any:
+        """Cliente do servidor; o pool (e o contexto SSL) só é criado na primeira requisição"""
+        if backend.client is None and self.client_factory:
+            backend.client = self.client_factory(backend.url)
+        return backend.client
+
+    def set_weight(self, url: str, weight: int) -> Optional[Backend]:
+        backend = self.backends.get(url.rstrip("/"))
+        if backend is not None:
+            backend.weight = weight
+            backend.current_weight = 0
+        return backend
+
+    async def drain(self, url: str, timeout: float = 30.0) -> bool:
+        """Para de enviar requisições novas e aguarda as em andamento; False se estourar o timeout"""
+        backend = self.backends.get(url.rstrip("/"))
+        if backend is None:
+            return False
+        backend.state = DRAINING
+        deadline = time.monotonic() + timeout
+        while backend.inflight > 0:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def remove(self, url: str, timeout: float = 30.0) -> bool:
+        url = url.rstrip("/")
+        if url not in self.backends:
+            return False
+        drained = await self.drain(url, timeout)
+        # Só remove se ninguém reativou o servidor durante a drenagem
+        backend = self.backends.get(url)
+        if backend is not None and backend.state == DRAINING:
+            del self.backends[url]
+            if backend.client is not None:
+                await backend.client.aclose()
+        return drained
+
+    async def sync(self, desired: List[Tuple[str, int]], timeout: float = 30.0):
+        """Aplica uma lista completa: adiciona/ajusta os presentes e drena e remove os ausentes"""
+        wanted = {url.rstrip("/"): weight for url, weight in desired}
+        for url, weight in wanted.items():
+            self.add(url, weight)
+        removed = [url for url in self.backends if url not in wanted]
+        await asyncio.gather(*[self.remove(url, timeout) for url in removed])
+
+    async def close(self):
+        for backend in self.backends.values():
+            if backend.client is not None:
+                await backend.client.aclose()
+
+    def snapshot(self) -> List[dict]:
+        return [b.to_dict() for b in self.backends.values()]
+
+
+async def watch_backends_file(registry: BackendRegistry, path: str, interval: float, logger):
+    """Recarrega o arquivo de servidores sempre que ele for modificado"""
+    last_mtime = None
+    while True:
+        try:
+            mtime = os.stat(path).st_mtime
+            if mtime != last_mtime:
+                desired = read_backends_file(path)
+                if desired:
+                    await registry.sync(desired)
+                    logger.info("Servidores recarregados de %s: %s", path, registry.urls())
+                last_mtime = mtime
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Erro ao recarregar %s: %s", path, e)
+        await asyncio.sleep(interval)
@@ -1,21 +1,46 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-import requests
+# Primeiro import: cada bloco abaixo entra em slowest_imports do relatório de inicialização
+from startup import startup_report, readiness
 import json
 import os
+import socket
 from datetime import datetime, timedelta
 from typing import TypeVar, Generic, Optional, Any, Dict, List
-from pydantic import BaseModel
 import logging
 import time
 import threading
 from collections import defaultdict
+from contextlib import asynccontextmanager
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+with startup_report.timed_import("fastapi"):
+    from fastapi import FastAPI, HTTPException
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from pydantic import BaseModel
+with startup_report.timed_import("structured_logging"):
+    from structured_logging import configure_logging, logging_stats
+with startup_report.timed_import("store"):
+    from store import MemoryMonitoringStore, SQLiteMonitoringStore
+
+# Configurar logging (JSON em fila, gravado por uma thread)
+configure_logging("monitoring")
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Monitoring Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_report.phase("store"):
+        store.setup()
+    # Monitoramento em background só depois do import, quando o serviço sobe de fato
+    with startup_report.phase("monitor_thread"):
+        monitor_thread.start()
+    startup_report.mark_ready()
+    logger.info("Monitoramento pronto: %s", json.dumps(startup_report.to_dict()))
+    yield
+    stop_monitor.set()
+    # Outro worker assume os health checks sem esperar a lease vencer
+    store.release_lead(PROBER_LEADERSHIP, WORKER_ID)
+
+# Respostas serializadas com orjson
+app = FastAPI(title="Monitoring Service", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +73,9 @@ class Metric(BaseModel):
     status_code: int
     timestamp: datetime
 
+class TraceBatch(BaseModel):
+    spans: List[Dict[str, Any]]
+
 # Configuração dos serviços
 SERVICES = {
     "api_gateway": "http://localhost:8000",
@@ -57,14 +85,55 @@ SERVICES = {
     "cache": "http://localhost:8004"
 }
 
-# Armazenamento de métricas (em produção, usar banco de dados)
-metrics_db = []
-health_status = {}
-request_counts = defaultdict(int)
-error_counts = defaultdict(int)
+# Métricas, saúde dos serviços e spans (mantém os METRIC_RETENTION/TRACE_RETENTION mais recentes).
+# Com MONITORING_DB_PATH ficam num SQLite compartilhado pelos workers (uvicorn --workers N);
+# sem ele, na memória do processo (um único worker)
+MONITORING_DB_PATH = os.getenv("MONITORING_DB_PATH")
+METRIC_RETENTION = int(os.getenv("METRIC_RETENTION", "1000"))
+TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", "1000"))
+store = SQLiteMonitoringStore(
+    MONITORING_DB_PATH,
+    metric_retention=METRIC_RETENTION,
+    trace_retention=TRACE_RETENTION
+) if MONITORING_DB_PATH else MemoryMonitoringStore(
+    metric_retention=METRIC_RETENTION,
+    trace_retention=TRACE_RETENTION
+)
+
+# Só um worker faz os health checks: o que tiver a lease de líder, renovada a cada volta
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "90"))
+PROBER_LEADERSHIP = "health-prober"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+is_leader = False
+
+def stored_metrics(service: Optional[str] = None, endpoint: Optional[str] = None) -> List[Metric]:
+    return [Metric(**m) for m in store.metrics(service, endpoint)]
+
+def health_status() -> Dict[str, ServiceHealth]:
+    return {name: ServiceHealth(**health) for name, health in store.health().items()}
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def trace_summary(trace_id: str, spans: List[dict]) -> dict:
+    start = min(s["start_ns"] for s in spans)
+    end = max(s["end_ns"] for s in spans)
+    roots = [s for s in spans if not s.get("parent_id")]
+    return {
+        "trace_id": trace_id,
+        "root": roots[0]["name"] if roots else None,
+        "duration_ms": (end - start) / 1e6,
+        "services": sorted({s["service"] for s in spans}),
+        "spans": len(spans)
+    }
 
 def check_service_health(service_name: str, url: str) -> ServiceHealth:
     """Verifica a saúde de um serviço"""
+    # Importado na thread de monitoramento, fora do caminho do startup
+    import requests
+
     start_time = time.time()
     try:
         response = requests.get(f"{url}/saude", timeout=5)
@@ -82,7 +151,7 @@ def check_service_health(service_name: str, url: str) -> ServiceHealth:
         response_time = time.time() - start_time
         status = "unreachable"
         uptime = None
-        logger.error(f"Erro ao verificar {service_name}: {e}")
+        logger.error("Erro ao verificar %s: %s", service_name, e)
     
     return ServiceHealth(
         name=service_name,
@@ -94,18 +163,32 @@ def check_service_health(service_name: str, url: str) -> ServiceHealth:
     )
 
 def monitor_services():
-    """Função para monitorar serviços em background"""
-    while True:
-        for service_name, url in SERVICES.items():
-            health = check_service_health(service_name, url)
-            health_status[service_name] = health
-            logger.info(f"Health check {service_name}: {health.status} ({health.response_time:.3f}s)")
+    """Função para monitorar serviços em background (só no worker líder)"""
+    global is_leader
+    last_check = 0.0
+    while not stop_monitor.is_set():
+        try:
+            leader = store.try_lead(PROBER_LEADERSHIP, WORKER_ID, LEADER_LEASE_TTL)
+        except Exception as e:
+            logger.error("Erro ao renovar a liderança dos health checks: %s", e)
+            leader = False
+        if leader != is_leader:
+            logger.info("Worker %s %s os health checks", WORKER_ID, "assumiu" if leader else "deixou")
+            is_leader = leader
+            last_check = 0.0
+        if leader and time.monotonic() - last_check >= HEALTH_CHECK_INTERVAL:
+            last_check = time.monotonic()
+            for service_name, url in SERVICES.items():
+                health = check_service_health(service_name, url)
+                store.set_health(service_name, health.model_dump(mode="json"))
+                logger.info("Health check %s: %s (%.3fs)", service_name, health.status, health.response_time)
         
-        time.sleep(30)  # Verificar a cada 30 segundos
+        # Renova a lease bem antes de vencer, mesmo entre health checks
+        stop_monitor.wait(min(HEALTH_CHECK_INTERVAL, LEADER_LEASE_TTL / 3))
 
-# Iniciar monitoramento em background
-monitor_thread = threading.Thread(target=monitor_services, daemon=True)
-monitor_thread.start()
+# Monitoramento em background, iniciado no lifespan
+stop_monitor = threading.Event()
+monitor_thread = threading.Thread(target=monitor_services, name="health-monitor", daemon=True)
 
 @app.get("/saude")
 def saude():
@@ -114,17 +197,30 @@ def saude():
         data={
             "status": "saudavel",
             "servico": "monitoring-service",
-            "servicos_monitorados": len(SERVICES)
+            "servicos_monitorados": len(SERVICES),
+            "worker": WORKER_ID,
+            "lider_health_checks": is_leader,
+            "store": "sqlite" if MONITORING_DB_PATH else "memory",
+            "logging": logging_stats()
         }
     )
 
+@app.get("/pronto")
+def pronto():
+    """Readiness: startup concluído e thread de monitoramento viva (/saude é só liveness)"""
+    status_code, data = readiness({"startup": startup_report.ready, "monitor": monitor_thread.is_alive()})
+    return ORJSONResponse(
+        status_code=status_code,
+        content=ResponseModel(status="success" if status_code == 200 else "error", data=data).model_dump()
+    )
+
 @app.get("/health")
 def get_health_status():
     """Retorna o status de saúde de todos os serviços"""
     return ResponseModel(
         status="success",
         data={
-            "services": health_status,
+            "services": health_status(),
             "timestamp": datetime.now(),
             "total_services": len(SERVICES)
         }
@@ -139,10 +235,11 @@ def get_service_health(service_name: str):
             message=f"Serviço não encontrado: {service_name}"
         )
     
-    if service_name in health_status:
+    services = health_status()
+    if service_name in services:
         return ResponseModel(
             status="success",
-            data=health_status[service_name]
+            data=services[service_name]
         )
     else:
         return ResponseModel(
@@ -153,18 +250,8 @@ def get_service_health(service_name: str):
 @app.post("/metrics")
 def add_metric(metric: Metric):
     """Adiciona uma nova métrica"""
-    metrics_db.append(metric)
-    
-    # Contar requisições
-    request_counts[f"{metric.service}:{metric.endpoint}"] += 1
-    
-    # Contar erros
-    if metric.status_code >= 400:
-        error_counts[f"{metric.service}:{metric.endpoint}"] += 1
-    
-    # Manter apenas as últimas 1000 métricas
-    if len(metrics_db) > 1000:
-        metrics_db.pop(0)
+    # O store mantém as últimas METRIC_RETENTION e conta requisições e erros por endpoint
+    store.add_metric(metric.model_dump(mode="json"))
     
     return ResponseModel(
         status="success",
@@ -178,13 +265,7 @@ def get_metrics(
     limit: int = 100
 ):
     """Retorna métricas filtradas"""
-    filtered_metrics = metrics_db
-    
-    if service:
-        filtered_metrics = [m for m in filtered_metrics if m.service == service]
-    
-    if endpoint:
-        filtered_metrics = [m for m in filtered_metrics if m.endpoint == endpoint]
+    filtered_metrics = stored_metrics(service or None, endpoint or None)
     
     # Retornar as métricas mais recentes
     recent_metrics = filtered_metrics[-limit:]
@@ -201,6 +282,7 @@ def get_metrics(
 @app.get("/metrics/summary")
 def get_metrics_summary():
     """Retorna um resumo das métricas"""
+    metrics_db = stored_metrics()
     if not metrics_db:
         return ResponseModel(
             status="success",
@@ -235,6 +317,7 @@ def get_metrics_summary():
             "error_rate": (total_errors / total_requests) * 100 if total_requests > 0 else 0,
             "avg_response_time": avg_response_time,
             "service_breakdown": service_breakdown,
+            "endpoint_counts": store.counts(),
             "period": {
                 "start": metrics_db[0].timestamp if metrics_db else None,
                 "end": metrics_db[-1].timestamp if metrics_db else None
@@ -242,13 +325,77 @@ def get_metrics_summary():
         }
     )
 
+@app.post("/traces")
+def add_traces(batch: TraceBatch):
+    """Recebe um lote de spans exportado por um serviço"""
+    store.add_spans(batch.spans)
+    
+    return ResponseModel(
+        status="success",
+        message=f"{len(batch.spans)} spans recebidos"
+    )
+
+@app.get("/traces")
+def get_traces(limit: int = 50):
+    """Retorna os traces mais recentes"""
+    recent = store.traces(limit)
+    return ResponseModel(
+        status="success",
+        data={
+            "traces": [trace_summary(trace_id, spans) for trace_id, spans in recent],
+            "total": store.trace_count()
+        }
+    )
+
+@app.get("/traces/breakdown")
+def get_traces_breakdown():
+    """Latência por serviço e etapa (auth, seleção de servidor, upstream, banco, serialização)"""
+    durations = defaultdict(list)
+    for _, spans in store.traces():
+        for span in spans:
+            durations[f"{span['service']}:{span['name']}"].append(span["duration_ms"])
+    
+    return ResponseModel(
+        status="success",
+        data={
+            key: {
+                "count": len(values),
+                "avg_ms": sum(values) / len(values),
+                "p50_ms": percentile(values, 0.50),
+                "p99_ms": percentile(values, 0.99),
+                "max_ms": max(values)
+            }
+            for key, values in sorted(durations.items())
+        }
+    )
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Retorna os spans de um trace em ordem cronológica"""
+    spans = store.trace(trace_id)
+    if not spans:
+        return ResponseModel(
+            status="error",
+            message=f"Trace não encontrado: {trace_id}"
+        )
+    
+    start = min(s["start_ns"] for s in spans)
+    spans.sort(key=lambda s: s["start_ns"])
+    return ResponseModel(
+        status="success",
+        data={
+            **trace_summary(trace_id, spans),
+            "spans": [{**s, "offset_ms": (s["start_ns"] - start) / 1e6} for s in spans]
+        }
+    )
+
 @app.get("/alerts")
 def get_alerts():
     """Retorna alertas baseados nas métricas"""
     alerts = []
     
     # Verificar serviços não saudáveis
-    for service_name, health in health_status.items():
+    for service_name, health in health_status().items():
         if health.status != "healthy":
             alerts.append({
                 "type": "service_unhealthy",
@@ -259,6 +406,7 @@ def get_alerts():
             })
     
     # Verificar alta taxa de erro
+    metrics_db = stored_metrics()
     if metrics_db:
         recent_metrics = [m for m in metrics_db if m.timestamp > datetime.now() - timedelta(minutes=5)]
         if recent_metrics:
@@ -298,9 +446,12 @@ def get_dashboard():
     return ResponseModel(
         status="success",
         data={
-            "health": health_status,
+            "health": health_status(),
             "summary": get_metrics_summary().data,
             "alerts": get_alerts().data,
             "timestamp": datetime.now()
         }
-    ) 
\ No newline at end of file
+    )
+
+# Fim do import do módulo; o restante do startup é medido no lifespan
+startup_report.imports_finished()
@@ -0,0 +1,295 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+
+class MonitoringStore(ABC):
+    """Interface do armazenamento do monitoramento (métricas, saúde, traces e líder)"""
+
+    def setup(self):
+        """Prepara o armazenamento no startup (ex.: cria as tabelas)"""
+
+    @abstractmethod
+    def add_metric(self, metric: dict):
+        ...
+
+    @abstractmethod
+    def metrics(self, service: Optional[str] = None, endpoint: Optional[str] = None) -> List[dict]:
+        """Métricas retidas, da mais antiga para a mais recente"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Totais acumulados por "serviço:endpoint" (não limitados pela retenção)"""
+
+    @abstractmethod
+    def set_health(self, service: str, health: dict):
+        ...
+
+    @abstractmethod
+    def health(self) -> Dict[str, dict]:
+        ...
+
+    @abstractmethod
+    def add_spans(self, spans: List[dict]) -> int:
+        ...
+
+    @abstractmethod
+    def traces(self, limit: Optional[int] = None) -> List[Tuple[str, List[dict]]]:
+        """Traces do mais recente para o mais antigo"""
+
+    @abstractmethod
+    def trace(self, trace_id: str) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def trace_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def try_lead(self, name: str, holder: str, ttl: float) -> bool:
+        """Obtém ou renova a liderança `name` por `ttl` segundos; False se outro a tem"""
+
+    @abstractmethod
+    def release_lead(self, name: str, holder: str):
+        ...
+
+
+class MemoryMonitoringStore(MonitoringStore):
+    """Tudo na memória do processo: só serve com um único worker"""
+
+    def __init__(self, metric_retention: int = 1000, trace_retention: int = 1000):
+        self.metric_list: "deque[dict]" = deque(maxlen=metric_retention)
+        self.request_counts: Dict[str, Dict[str, int]] = {}
+        self.health_status: Dict[str, dict] = {}
+        self.trace_retention = trace_retention
+        self.traces_db: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add_metric(self, metric: dict):
+        key = f"{metric['service']}:{metric['endpoint']}"
+        with self.lock:
+            self.metric_list.append(metric)
+            counts = self.request_counts.setdefault(key, {"requests": 0, "errors": 0})
+            counts["requests"] += 1
+            if metric["status_code"] >= 400:
+                counts["errors"] += 1
+
+    def metrics(self, service: Optional[str] = None, endpoint: Optional[str] = None) -> List[dict]:
+        with self.lock:
+            metrics = list(self.metric_list)
+        return [
+            m for m in metrics
+            if (service is None or m["service"] == service) and (endpoint is None or m["endpoint"] == endpoint)
+        ]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {key: dict(value) for key, value in self.request_counts.items()}
+
+    def set_health(self, service: str, health: dict):
+        self.health_status[service] = health
+
+    def health(self) -> Dict[str, dict]:
+        return dict(self.health_status)
+
+    def add_spans(self, spans: List[dict]) -> int:
+        with self.lock:
+            for span in spans:
+                trace_id = span.get("trace_id")
+                if not trace_id:
+                    continue
+                self.traces_db.setdefault(trace_id, []).append(span)
+                self.traces_db.move_to_end(trace_id)
+            while len(self.traces_db) > self.trace_retention:
+                self.traces_db.popitem(last=False)
+        return len(spans)
+
+    def traces(self, limit: Optional[int] = None) -> List[Tuple[str, List[dict]]]:
+        with self.lock:
+            items = list(self.traces_db.items())
+        items.reverse()
+        return items[:limit] if limit is not None else items
+
+    def trace(self, trace_id: str) -> List[dict]:
+        with self.lock:
+            return list(self.traces_db.get(trace_id, []))
+
+    def trace_count(self) -> int:
+        return len(self.traces_db)
+
+    def try_lead(self, name: str, holder: str, ttl: float) -> bool:
+        return True
+
+    def release_lead(self, name: str, holder: str):
+        pass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metricas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contadores (
+    chave TEXT PRIMARY KEY,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS saude_servicos (
+    service TEXT PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS traces (
+    trace_id TEXT PRIMARY KEY,
+    spans TEXT NOT NULL,
+    atualizado INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_traces_atualizado ON traces (atualizado);
+CREATE TABLE IF NOT EXISTS lideres (
+    nome TEXT PRIMARY KEY,
+    dono TEXT NOT NULL,
+    expira REAL NOT NULL
+);
+"""
+
+# Spans de um trace em NDJSON: cada lote novo é concatenado sem reler os anteriores
+UPSERT_TRACE = """
+INSERT INTO traces (trace_id, spans, atualizado) VALUES (?, ?, ?)
+ON CONFLICT (trace_id) DO UPDATE SET spans = traces.spans || excluded.spans, atualizado = excluded.atualizado
+"""
+PRUNE_TRACES = """
+DELETE FROM traces WHERE atualizado < (
+    SELECT atualizado FROM traces ORDER BY atualizado DESC LIMIT 1 OFFSET ?
+)
+"""
+UPSERT_COUNT = """
+INSERT INTO contadores (chave, requests, errors) VALUES (?, 1, ?)
+ON CONFLICT (chave) DO UPDATE SET requests = requests + 1, errors = errors + excluded.errors
+"""
+# Lease: assume se estiver livre, vencida ou já for do mesmo dono (renovação)
+TRY_LEAD = """
+INSERT INTO lideres (nome, dono, expira) VALUES (?, ?, ?)
+ON CONFLICT (nome) DO UPDATE SET dono = excluded.dono, expira = excluded.expira
+WHERE lideres.dono = excluded.dono OR lideres.expira < ?
+"""
+
+
+class SQLiteMonitoringStore(MonitoringStore):
+    """Arquivo SQLite em modo WAL compartilhado pelos workers da mesma máquina.
+
+    Cada thread tem a sua conexão; no WAL as leituras não bloqueiam a escrita e
+    as escritas concorrentes esperam até `busy_timeout`. A liderança é uma
+    lease numa tabela, renovada pelo dono antes de vencer.
+    """
+
+    def __init__(self, path: str, metric_retention: int = 1000, trace_retention: int = 1000,
+                 busy_timeout: float = 5.0):
+        self.path = path
+        self.metric_retention = metric_retention
+        self.trace_retention = trace_retention
+        self.busy_timeout = busy_timeout
+        self.local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit; transações explícitas com BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _write(self, statements: List[Tuple[str, tuple]]) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            changes = 0
+            for sql, params in statements:
+                changes += conn.execute(sql, params).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changes
+
+    def setup(self):
+        conn = self._conn()
+        # O modo WAL fica gravado no arquivo: vale para as conexões de todos os workers
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def add_metric(self, metric: dict):
+        self._write([
+            ("INSERT INTO metricas (service, endpoint, dados) VALUES (?, ?, ?)",
+             (metric["service"], metric["endpoint"], json.dumps(metric))),
+            ("DELETE FROM metricas WHERE id <= (SELECT MAX(id) FROM metricas) - ?", (self.metric_retention,)),
+            (UPSERT_COUNT, (f"{metric['service']}:{metric['endpoint']}", 1 if metric["status_code"] >= 400 else 0))
+        ])
+
+    def metrics(self, service: Optional[str] = None, endpoint: Optional[str] = None) -> List[dict]:
+        sql, params = "SELECT dados FROM metricas WHERE 1 = 1", []
+        if service is not None:
+            sql += " AND service = ?"
+            params.append(service)
+        if endpoint is not None:
+            sql += " AND endpoint = ?"
+            params.append(endpoint)
+        rows = self._conn().execute(sql + " ORDER BY id", params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        rows = self._conn().execute("SELECT chave, requests, errors FROM contadores").fetchall()
+        return {key: {"requests": requests, "errors": errors} for key, requests, errors in rows}
+
+    def set_health(self, service: str, health: dict):
+        self._write([(
+            "INSERT INTO saude_servicos (service, dados) VALUES (?, ?) "
+            "ON CONFLICT (service) DO UPDATE SET dados = excluded.dados",
+            (service, json.dumps(health))
+        )])
+
+    def health(self) -> Dict[str, dict]:
+        rows = self._conn().execute("SELECT service, dados FROM saude_servicos").fetchall()
+        return {service: json.loads(dados) for service, dados in rows}
+
+    def add_spans(self, spans: List[dict]) -> int:
+        by_trace: Dict[str, List[str]] = {}
+        for span in spans:
+            if span.get("trace_id"):
+                by_trace.setdefault(span["trace_id"], []).append(json.dumps(span) + "\n")
+        now = time.time_ns()
+        self._write(
+            [(UPSERT_TRACE, (trace_id, "".join(lines), now)) for trace_id, lines in by_trace.items()]
+            + [(PRUNE_TRACES, (self.trace_retention - 1,))]
+        )
+        return len(spans)
+
+    @staticmethod
+    def _spans(ndjson: str) -> List[dict]:
+        return [json.loads(line) for line in ndjson.splitlines() if line]
+
+    def traces(self, limit: Optional[int] = None) -> List[Tuple[str, List[dict]]]:
+        rows = self._conn().execute(
+            "SELECT trace_id, spans FROM traces ORDER BY atualizado DESC LIMIT ?",
+            (limit if limit is not None else -1,)
+        ).fetchall()
+        return [(trace_id, self._spans(spans)) for trace_id, spans in rows]
+
+    def trace(self, trace_id: str) -> List[dict]:
+        row = self._conn().execute("SELECT spans FROM traces WHERE trace_id = ?", (trace_id,)).fetchone()
+        return self._spans(row[0]) if row else []
+
+    def trace_count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM traces").fetchone()[0]
+
+    def try_lead(self, name: str, holder: str, ttl: float) -> bool:
+        now = time.time()
+        return self._write([(TRY_LEAD, (name, holder, now + ttl, now))]) == 1
+
+    def release_lead(self, name: str, holder: str):
+        self._write([("DELETE FROM lideres WHERE nome = ? AND dono = ?", (name, holder))])
@@ -34,6 +34,7 @@ cd server
 source venv/bin/activate
 export DATABASE_URL="postgresql://sued@localhost:5432/arquitetura"
 export PORTA=8002
+export AUTO_MIGRATE=true  # cria/atualiza o schema antes de atender
 uvicorn main:app --host 0.0.0.0 --port 8002 &
 echo "✅ Server 1 iniciado na porta 8002"
 cd ..
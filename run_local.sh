@@ -13,7 +13,7 @@ kill_port() {
 # Função para limpar o banco de dados
 clean_database() {
     echo "🧹 Limpando banco de dados..."
-    psql -U postgres -d arquitetura -c "DROP TABLE IF EXISTS itens CASCADE;" 2>/dev/null || echo "Erro ao limpar banco (pode ignorar se for primeira execução)"
+    psql -U postgres -d arquitetura -c "DROP TABLE IF EXISTS itens, schema_version CASCADE;" 2>/dev/null || echo "Erro ao limpar banco (pode ignorar se for primeira execução)"
 }
 
 # Matar processos nas portas que vamos usar
@@ -80,7 +80,7 @@ run_service() {
     sleep 3
     
     # Verificar se o serviço está rodando
-    if curl -s http://localhost:$port/saude > /dev/null 2>&1; then
+    if curl -sf http://localhost:$port/pronto > /dev/null 2>&1; then
         echo "✅ $service_name rodando em http://localhost:$port"
     else
         echo "⚠️  $service_name pode não estar respondendo ainda"
@@ -91,8 +91,10 @@ run_service() {
 echo ""
 echo "🎯 Iniciando serviços..."
 
-# 1. Server (Backend)
+# 1. Server (Backend), aplicando as migrações do banco ao iniciar
+export AUTO_MIGRATE=true
 run_service "Server" 8002 "server"
+unset AUTO_MIGRATE
 
 # 2. Load Balancer
 run_service "Load Balancer" 8001 "load_balancer"
@@ -0,0 +1,54 @@
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator, Optional, Sequence
+
+import orjson
+
+# Formato -> media type da exportação
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"  # o Starlette acrescenta "; charset=utf-8"
+}
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def encode_rows(rows: Sequence[tuple], fields: Sequence[str], formato: str) -> bytes:
+    """Um lote de linhas já no formato de saída"""
+    if formato == "ndjson":
+        return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def export_stream(batches: Iterable[Sequence[tuple]], fields: Sequence[str], formato: str, gzip: bool = False) -> Iterator[bytes]:
+    """Converte os lotes do cursor em pedaços de bytes, um por lote.
+
+    Só um lote fica em memória por vez; com gzip o compressor é incremental
+    e o fim do stream gzip sai depois do último lote.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+
+    def chunks() -> Iterator[bytes]:
+        if formato == "csv":
+            yield encode_rows([fields], fields, formato)
+        for rows in batches:
+            yield encode_rows(rows, fields, formato)
+
+    for chunk in chunks():
+        if compressor is None:
+            yield chunk
+            continue
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    if compressor is not None:
+        yield compressor.flush()
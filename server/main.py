@@ -1,16 +1,55 @@
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from pydantic import BaseModel
+# Primeiro import: cada bloco abaixo entra em slowest_imports do relatório de inicialização
+from startup import startup_report, readiness
 import os
-from dotenv import load_dotenv
+import asyncio
+from contextlib import asynccontextmanager
+import time
 from typing import TypeVar, Generic, Optional, Any
+import logging
+
+with startup_report.timed_import("fastapi"):
+    from fastapi import FastAPI, HTTPException, Depends, Request, Query
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from pydantic import BaseModel
+    from starlette.responses import Response, StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+with startup_report.timed_import("sqlalchemy"):
+    from sqlalchemy import create_engine, Column, Integer, String, Float, Index, select, insert, update, delete, text, case, and_, or_
+    from sqlalchemy.ext.declarative import declarative_base
+    from sqlalchemy.orm import sessionmaker, Session
+with startup_report.timed_import("dotenv"):
+    from dotenv import load_dotenv
+with startup_report.timed_import("orjson"):
+    import orjson
+with startup_report.timed_import("structured_logging"):
+    from structured_logging import configure_logging, logging_stats
+with startup_report.timed_import("modulos do servidor"):
+    from tracing import tracer_from_env, TRACEPARENT
+    from migrations import migrate, current_version, LATEST_VERSION
+    from query_stats import QueryStats
+    from db_routing import ReadRouter, READ_YOUR_WRITES
+    from export import EXPORT_FORMATS, accepts_gzip, export_stream
+    from search import PrefixIndex
+    from outbox import OutboxDrainer, RedisStreamPublisher, events_since
 
 load_dotenv()
 
-app = FastAPI(title="Servidor de Aplicação")
+# Configurar logging (JSON em fila, gravado por uma thread)
+configure_logging("servidor")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nada pesado no import: migrações e threads de fundo começam aqui
+    await run_in_threadpool(iniciar_servico)
+    startup_report.mark_ready()
+    logger.info("Servidor pronto: %s", orjson.dumps(startup_report.to_dict()).decode())
+    yield
+    engine.dispose()
+
+# Respostas serializadas com orjson
+app = FastAPI(title="Servidor de Aplicação", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +64,37 @@ engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# O schema é criado pelas migrações (python migrations.py upgrade); AUTO_MIGRATE=true aplica na inicialização
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+
+# Tempo por statement e planos dos lentos, expostos em /db/stats
+query_stats = QueryStats(slow_ms=float(os.getenv("SLOW_QUERY_MS", "100")))
+query_stats.attach(engine)
+
+# Leituras em réplicas (pools próprios), escritas no primário; vazio = tudo no primário
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+read_router = ReadRouter(
+    SessionLocal,
+    DATABASE_REPLICA_URLS,
+    max_lag_s=float(os.getenv("REPLICA_MAX_LAG_S", "5")),
+    check_interval=float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5")),
+    window_s=float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+)
+for replica in read_router.replicas:
+    query_stats.attach(replica.engine)
+
+# Validação local dos tokens com as chaves públicas do gateway (opcional)
+JWKS_URL = os.getenv("JWKS_URL")
+token_verifier = None
+if JWKS_URL:
+    # PyJWT só é importado quando a validação local está ativa
+    import jwt
+    from token_verifier import TokenVerifier, bearer_token
+    token_verifier = TokenVerifier(JWKS_URL, cache_ttl=int(os.getenv("JWKS_CACHE_TTL", "300")))
+
+# Tracing distribuído: spans de consulta ao banco e serialização dentro do trace do gateway
+tracer = tracer_from_env(os.getenv("TRACE_SERVICE_NAME", "servidor"))
+
 class ResponseModel(BaseModel):
     status: str
     data: Optional[Any] = None
@@ -36,19 +106,38 @@ class Item(Base):
     nome = Column(String(100), nullable=False)
     descricao = Column(String(500))
     preco = Column(Float, nullable=False)
+    # Incrementada a cada escrita; quem envia ?versao= só altera se ninguém escreveu antes (migração 3)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    # Criados pela migração 2 (mais ix_itens_nome_prefixo com varchar_pattern_ops no PostgreSQL)
+    __table_args__ = (
+        Index("ix_itens_nome", "nome"),
+        Index("ix_itens_preco", "preco", "id"),
+    )
 
-Base.metadata.create_all(bind=engine)
+class ItemEvento(Base):
+    # Outbox (migração 6); só o que as escritas gravam, o resto é preenchido pelo drenador
+    __tablename__ = "item_eventos"
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False)
+    operacao = Column(String(10), nullable=False)
+    versao = Column(Integer, nullable=False)
 
 class ItemCreate(BaseModel):
     nome: str
     descricao: str | None = None
     preco: float
 
+class ItemUpdate(BaseModel):
+    nome: str | None = None
+    descricao: str | None = None
+    preco: float | None = None
+
 class ItemResponse(BaseModel):
     id: int
     nome: str
     descricao: str | None
     preco: float
+    versao: int
     class Config:
         from_attributes = True
 
@@ -59,59 +148,421 @@ def get_db():
     finally:
         db.close()
 
+def client_key(request: Request) -> str:
+    return ReadRouter.client_key(request.headers.get("Authorization"), request.client.host if request.client else None)
+
+def get_read_db(request: Request):
+    # Réplica, ou o primário logo depois de uma escrita do mesmo cliente
+    db = read_router.read_sessions(client_key(request), request.headers.get(READ_YOUR_WRITES))()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Autocompletar servido da memória; reconstruído periodicamente a partir de uma réplica
+def load_item_names():
+    db = read_router.read_sessions("autocompletar")()
+    try:
+        return db.execute(select(Item.id, Item.nome).execution_options(yield_per=10000)).all()
+    finally:
+        db.close()
+
+# Eventos de alteração gravados na transação da escrita e drenados em ordem (Redis Stream opcional)
+ITEM_EVENTS_REDIS_URL = os.getenv("ITEM_EVENTS_REDIS_URL")
+outbox_drainer = OutboxDrainer(
+    engine,
+    publisher=RedisStreamPublisher(
+        ITEM_EVENTS_REDIS_URL,
+        stream=os.getenv("ITEM_EVENTS_STREAM", "itens:eventos"),
+        maxlen=int(os.getenv("ITEM_EVENTS_STREAM_MAXLEN", "100000"))
+    ) if ITEM_EVENTS_REDIS_URL else None,
+    interval=float(os.getenv("OUTBOX_DRAIN_INTERVAL", "0.5")),
+    retention_s=float(os.getenv("OUTBOX_RETENTION", "86400"))
+)
+
+autocomplete_index = PrefixIndex(load_item_names, refresh_interval=float(os.getenv("AUTOCOMPLETE_REFRESH_INTERVAL", "60")))
+
+# Busca textual no PostgreSQL (coluna busca e índice GIN das migrações 4 e 5)
+FULLTEXT_QUERY = text("""
+SELECT id, nome, descricao, preco, versao, ts_rank_cd(busca, consulta) AS relevancia
+FROM itens, websearch_to_tsquery('portuguese', :q) AS consulta
+WHERE busca @@ consulta
+ORDER BY relevancia DESC, id
+LIMIT :limite OFFSET :deslocamento
+""")
+
+# Colunas lidas direto nas listagens, sem montar objetos ORM
+ITEM_COLUMNS = (Item.id, Item.nome, Item.descricao, Item.preco, Item.versao)
+ITEM_FIELDS = ("id", "nome", "descricao", "preco", "versao")
+
+# Ordenações aceitas em GET /itens, sempre desempatadas por id (cobertas pelos índices)
+ORDERINGS = {
+    "id": (Item.id,),
+    "nome": (Item.nome, Item.id),
+    "preco": (Item.preco, Item.id),
+    "-preco": (Item.preco.desc(), Item.id.desc())
+}
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 def item_to_dict(item: Item) -> dict:
     """Converte um objeto Item para dicionário"""
     return {
         "id": item.id,
         "nome": item.nome,
         "descricao": item.descricao,
-        "preco": item.preco
+        "preco": item.preco,
+        "versao": item.versao
     }
 
+def escrita_sem_linha(db: Session, item_id: int, versao: Optional[int]) -> ResponseModel:
+    """UPDATE/DELETE sem linha afetada: distingue item inexistente de conflito de versão.
+
+    A consulta extra só acontece neste caminho de falha e só quando há versão.
+    """
+    if versao is not None and db.query(Item.id).filter(Item.id == item_id).first():
+        return ResponseModel(
+            status="error",
+            message=f"Conflito de versão: o item {item_id} foi alterado por outra requisição"
+        )
+    return ResponseModel(
+        status="error",
+        message="Item não encontrado"
+    )
+
+def registrar_evento(db: Session, item_id: int, operacao: str, versao: int):
+    # Na mesma transação da escrita: o evento existe se e somente se o commit acontecer
+    db.execute(insert(ItemEvento).values(item_id=item_id, operacao=operacao, versao=versao))
+
+def aplicar_atualizacao(db: Session, item_id: int, campos: dict, versao: Optional[int]) -> ResponseModel:
+    """Um único UPDATE ... RETURNING, com a versão na cláusula WHERE quando informada"""
+    stmt = update(Item).where(Item.id == item_id)
+    if versao is not None:
+        stmt = stmt.where(Item.versao == versao)
+    stmt = (
+        stmt.values(**campos, versao=Item.versao + 1)
+        .returning(*ITEM_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    with tracer.span("db_query", operation="update"):
+        row = db.execute(stmt).first()
+        if row is not None:
+            registrar_evento(db, row.id, "update", row.versao)
+        db.commit()
+    if row is None:
+        return escrita_sem_linha(db, item_id, versao)
+    outbox_drainer.notify()
+    autocomplete_index.upsert(row.id, row.nome)
+    return ResponseModel(
+        status="success",
+        data=dict(zip(ITEM_FIELDS, row))
+    )
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+@app.middleware("http")
+async def ler_apos_escrita(request: Request, call_next):
+    response = await call_next(request)
+    if read_router.replicas and request.method in WRITE_METHODS and request.url.path.startswith("/itens"):
+        # Próximas leituras do cliente vão ao primário até a réplica alcançar a escrita
+        response.headers[READ_YOUR_WRITES] = read_router.record_write(client_key(request))
+    return response
+
+@app.middleware("http")
+async def verificar_token(request: Request, call_next):
+    if token_verifier and request.url.path.startswith("/itens"):
+        token = bearer_token(request.headers.get("Authorization"))
+        try:
+            if not token:
+                raise jwt.InvalidTokenError("Token ausente")
+            # A busca do JWKS pode ir à rede quando o cache expira
+            with tracer.span("auth"):
+                await run_in_threadpool(token_verifier.verify, token)
+        except jwt.PyJWTError as e:
+            return Response(
+                content=ResponseModel(
+                    status="error",
+                    message=f"Token inválido: {e}"
+                ).model_dump_json(),
+                status_code=401,
+                media_type="application/json"
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def rastrear_requisicao(request: Request, call_next):
+    # Registrado por último: envolve também a validação do token
+    if not request.url.path.startswith("/itens"):
+        return await call_next(request)
+    with tracer.request_span("server.request", request.headers.get(TRACEPARENT)) as span:
+        span.set_attribute("http.method", request.method)
+        span.set_attribute("http.path", request.url.path)
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
 @app.get("/saude")
 def saude():
     porta = os.getenv("PORTA", "8002")
     return ResponseModel(
         status="success",
-        data={"status": "saudavel", "servidor": porta}
+        data={"status": "saudavel", "servidor": porta, "logging": logging_stats(), "autocompletar": autocomplete_index.stats(), "eventos": outbox_drainer.stats()}
+    )
+
+def iniciar_servico():
+    if AUTO_MIGRATE:
+        with startup_report.phase("migrations"):
+            applied = migrate(engine)
+        if applied:
+            logger.info("Migrações aplicadas: %s", applied)
+    with startup_report.phase("background_threads"):
+        outbox_drainer.start()
+        # Carga em segundo plano; até ficar pronto, o autocompletar consulta o banco
+        autocomplete_index.start()
+
+# Schema conferido até estar na última versão; depois disso não muda mais
+schema_ok = False
+
+@app.get("/pronto")
+def pronto():
+    """Readiness: startup concluído, banco acessível e schema na última migração (/saude é só liveness)"""
+    global schema_ok
+    checks = {"startup": startup_report.ready, "database": False, "schema": schema_ok}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        checks["database"] = True
+        if not schema_ok:
+            schema_ok = checks["schema"] = current_version(engine) >= LATEST_VERSION
+    except Exception as e:
+        logger.warning("Banco indisponível na verificação de prontidão: %s", e)
+    status_code, data = readiness(checks)
+    return ORJSONResponse(
+        status_code=status_code,
+        content=ResponseModel(status="success" if status_code == 200 else "error", data=data).model_dump()
+    )
+
+@app.get("/db/stats")
+def db_stats(top: int = 20):
+    query_stats.explain_pending(engine)
+    return ResponseModel(
+        status="success",
+        data={**query_stats.snapshot(top), "read_routing": read_router.stats()}
     )
 
 @app.post("/itens")
 def criar_item(item: ItemCreate, db: Session = Depends(get_db)):
     try:
-        novo = Item(**item.dict())
-        db.add(novo)
-        db.commit()
-        db.refresh(novo)
+        with tracer.span("db_query", operation="insert"):
+            novo = Item(**item.dict())
+            db.add(novo)
+            db.flush()
+            registrar_evento(db, novo.id, "create", novo.versao)
+            db.commit()
+            db.refresh(novo)
+        outbox_drainer.notify()
+        autocomplete_index.upsert(novo.id, novo.nome)
+        with tracer.span("serialize"):
+            return ResponseModel(
+                status="success",
+                data=item_to_dict(novo)
+            )
+    except Exception as e:
+        logger.error("Erro ao criar item: %s", e)
         return ResponseModel(
-            status="success",
-            data=item_to_dict(novo)
+            status="error",
+            message=str(e)
         )
+
+@app.get("/itens")
+def listar_itens(
+    nome: Optional[str] = None,
+    prefixo: Optional[str] = None,
+    preco_min: Optional[float] = None,
+    preco_max: Optional[float] = None,
+    ordenar: str = "id",
+    limite: Optional[int] = Query(None, ge=1, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    if ordenar not in ORDERINGS:
+        return ResponseModel(
+            status="error",
+            message=f"Ordenação inválida: {ordenar} (use {', '.join(ORDERINGS)})"
+        )
+    try:
+        query = db.query(*ITEM_COLUMNS)
+        if nome is not None:
+            query = query.filter(Item.nome == nome)
+        if prefixo:
+            query = query.filter(Item.nome.like(escape_like(prefixo) + "%", escape="\\"))
+        if preco_min is not None:
+            query = query.filter(Item.preco >= preco_min)
+        if preco_max is not None:
+            query = query.filter(Item.preco <= preco_max)
+        query = query.order_by(*ORDERINGS[ordenar])
+        if limite:
+            query = query.limit(limite)
+        with tracer.span("db_query", operation="select"):
+            rows = query.all()
+        with tracer.span("serialize", rows=len(rows)):
+            # Linhas direto para bytes, sem validação do ResponseModel por item
+            content = orjson.dumps({
+                "status": "success",
+                "data": [dict(zip(ITEM_FIELDS, row)) for row in rows],
+                "message": None
+            })
+        return Response(content=content, media_type="application/json")
     except Exception as e:
+        logger.error("Erro ao listar itens: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
         )
 
-@app.get("/itens")
-def listar_itens(db: Session = Depends(get_db)):
+@app.get("/itens/eventos")
+async def eventos_itens(
+    apos: int = Query(0, ge=0),
+    limite: int = Query(100, ge=1, le=1000),
+    espera: float = Query(0, ge=0, le=25)
+):
+    """Feed de alterações em ordem de `sequencia`, a partir de `apos` (long polling com `espera`).
+
+    O consumidor guarda a última sequência recebida e pede a partir dela; lido
+    sempre do primário para não perder eventos por atraso das réplicas.
+    """
+    deadline = time.monotonic() + espera
+    while True:
+        events = await run_in_threadpool(events_since, engine, apos, limite)
+        if events or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+    return ResponseModel(
+        status="success",
+        data={
+            "eventos": events,
+            "proxima": events[-1]["sequencia"] if events else apos
+        }
+    )
+
+def busca_like(db: Session, q: str, limite: int, deslocamento: int) -> list:
+    """Alternativa sem full-text (SQLite): todos os termos em nome ou descrição"""
+    conditions = []
+    for term in q.split():
+        pattern = f"%{escape_like(term)}%"
+        conditions.append(or_(Item.nome.ilike(pattern, escape="\\"), Item.descricao.ilike(pattern, escape="\\")))
+    # Itens com todos os termos no nome primeiro
+    relevancia = case((and_(*(Item.nome.ilike(f"%{escape_like(term)}%", escape="\\") for term in q.split())), 1.0), else_=0.5)
+    return db.execute(
+        select(*ITEM_COLUMNS, relevancia.label("relevancia"))
+        .where(and_(*conditions))
+        .order_by(relevancia.desc(), Item.id)
+        .limit(limite)
+        .offset(deslocamento)
+    ).all()
+
+# Antes de /itens/{item_id}, senão "busca" seria lido como id
+@app.get("/itens/busca")
+def buscar_itens(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    pagina: int = Query(1, ge=1),
+    tamanho: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Busca textual em nome e descrição, ordenada por relevância"""
+    fulltext = db.get_bind().dialect.name == "postgresql"
     try:
-        itens = db.query(Item).all()
-        itens_dict = [item_to_dict(item) for item in itens]
+        # Uma linha a mais só para saber se existe a próxima página
+        with tracer.span("db_query", operation="search", fulltext=fulltext):
+            if fulltext:
+                rows = db.execute(FULLTEXT_QUERY, {"q": q, "limite": tamanho + 1, "deslocamento": (pagina - 1) * tamanho}).all()
+            else:
+                rows = busca_like(db, q, tamanho + 1, (pagina - 1) * tamanho)
         return ResponseModel(
             status="success",
-            data=itens_dict
+            data={
+                "itens": [{**dict(zip(ITEM_FIELDS, row)), "relevancia": row.relevancia} for row in rows[:tamanho]],
+                "pagina": pagina,
+                "tamanho": tamanho,
+                "proxima_pagina": pagina + 1 if len(rows) > tamanho else None
+            }
         )
     except Exception as e:
+        logger.error("Erro na busca de itens: %s", e)
         return ResponseModel(
             status="error",
             message=str(e)
         )
 
+@app.get("/itens/autocompletar")
+def autocompletar_itens(
+    prefixo: str = Query(..., min_length=1, max_length=100),
+    limite: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    """Nomes que começam com o prefixo (em qualquer palavra), da memória"""
+    if autocomplete_index.ready:
+        return ResponseModel(
+            status="success",
+            data=autocomplete_index.search(prefixo, limite)
+        )
+    # Índice ainda carregando: prefixo do nome inteiro pelo índice ix_itens_nome_prefixo
+    with tracer.span("db_query", operation="autocomplete"):
+        rows = db.execute(
+            select(Item.id, Item.nome)
+            .where(Item.nome.like(escape_like(prefixo) + "%", escape="\\"))
+            .order_by(Item.nome, Item.id)
+            .limit(limite)
+        ).all()
+    return ResponseModel(
+        status="success",
+        data=[{"id": row.id, "nome": row.nome} for row in rows]
+    )
+
+# Antes de /itens/{item_id}, senão "export" seria lido como id
+@app.get("/itens/export")
+def exportar_itens(request: Request, formato: str = "ndjson", lote: int = Query(1000, ge=100, le=50000)):
+    """Catálogo completo em streaming (NDJSON ou CSV), lido de um cursor no servidor do banco"""
+    if formato not in EXPORT_FORMATS:
+        return ResponseModel(
+            status="error",
+            message=f"Formato inválido: {formato} (use {', '.join(EXPORT_FORMATS)})"
+        )
+    sessions = read_router.read_sessions(client_key(request), request.headers.get(READ_YOUR_WRITES))
+    gzip = accepts_gzip(request.headers.get("Accept-Encoding"))
+
+    def batches():
+        # Sessão própria: o gerador continua depois que o endpoint retorna.
+        # yield_per usa cursor no servidor (stream_results) no PostgreSQL
+        db = sessions()
+        try:
+            result = db.execute(
+                select(*ITEM_COLUMNS).order_by(Item.id).execution_options(yield_per=lote)
+            )
+            for rows in result.partitions():
+                yield rows
+        except Exception as e:
+            # Com o status já enviado, só resta interromper o stream
+            logger.error("Erro na exportação de itens: %s", e)
+            raise
+        finally:
+            db.close()
+
+    headers = {"Content-Disposition": f'attachment; filename="itens.{formato}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(batches(), ITEM_FIELDS, formato, gzip),
+        media_type=EXPORT_FORMATS[formato],
+        headers=headers
+    )
+
 @app.get("/itens/{item_id}")
-def obter_item(item_id: int, db: Session = Depends(get_db)):
+def obter_item(item_id: int, db: Session = Depends(get_read_db)):
     try:
-        item = db.query(Item).filter(Item.id == item_id).first()
+        with tracer.span("db_query", operation="select"):
+            item = db.query(Item).filter(Item.id == item_id).first()
         if not item:
             return ResponseModel(
                 status="error",
@@ -122,50 +573,69 @@ def obter_item(item_id: int, db: Session = Depends(get_db)):
             data=item_to_dict(item)
         )
     except Exception as e:
+        logger.error("Erro ao obter item %s: %s", item_id, e)
         return ResponseModel(
             status="error",
             message=str(e)
         )
 
 @app.put("/itens/{item_id}")
-def atualizar_item(item_id: int, item: ItemCreate, db: Session = Depends(get_db)):
+def atualizar_item(item_id: int, item: ItemCreate, versao: Optional[int] = None, db: Session = Depends(get_db)):
     try:
-        obj = db.query(Item).filter(Item.id == item_id).first()
-        if not obj:
-            return ResponseModel(
-                status="error",
-                message="Item não encontrado"
-            )
-        for k, v in item.dict().items():
-            setattr(obj, k, v)
-        db.commit()
-        db.refresh(obj)
+        return aplicar_atualizacao(db, item_id, item.dict(), versao)
+    except Exception as e:
+        logger.error("Erro ao atualizar item %s: %s", item_id, e)
         return ResponseModel(
-            status="success",
-            data=item_to_dict(obj)
+            status="error",
+            message=str(e)
         )
+
+@app.patch("/itens/{item_id}")
+def atualizar_item_parcial(item_id: int, item: ItemUpdate, versao: Optional[int] = None, db: Session = Depends(get_db)):
+    # Só os campos enviados no corpo; descricao aceita null, nome e preco não
+    campos = item.model_dump(exclude_unset=True)
+    if not campos:
+        return ResponseModel(
+            status="error",
+            message="Nenhum campo para atualizar"
+        )
+    nulos = [campo for campo in ("nome", "preco") if campo in campos and campos[campo] is None]
+    if nulos:
+        return ResponseModel(
+            status="error",
+            message=f"Campos obrigatórios não podem ser nulos: {', '.join(nulos)}"
+        )
+    try:
+        return aplicar_atualizacao(db, item_id, campos, versao)
     except Exception as e:
+        logger.error("Erro ao atualizar item %s: %s", item_id, e)
         return ResponseModel(
             status="error",
             message=str(e)
         )
 
 @app.delete("/itens/{item_id}")
-def remover_item(item_id: int, db: Session = Depends(get_db)):
+def remover_item(item_id: int, versao: Optional[int] = None, db: Session = Depends(get_db)):
     try:
-        obj = db.query(Item).filter(Item.id == item_id).first()
-        if not obj:
-            return ResponseModel(
-                status="error",
-                message="Item não encontrado"
-            )
-        db.delete(obj)
-        db.commit()
+        stmt = delete(Item).where(Item.id == item_id)
+        if versao is not None:
+            stmt = stmt.where(Item.versao == versao)
+        stmt = stmt.returning(Item.id, Item.versao).execution_options(synchronize_session=False)
+        with tracer.span("db_query", operation="delete"):
+            row = db.execute(stmt).first()
+            if row is not None:
+                registrar_evento(db, row.id, "delete", row.versao)
+            db.commit()
+        if row is None:
+            return escrita_sem_linha(db, item_id, versao)
+        outbox_drainer.notify()
+        autocomplete_index.remove(item_id)
         return ResponseModel(
             status="success",
             message="Item removido com sucesso"
         )
     except Exception as e:
+        logger.error("Erro ao remover item %s: %s", item_id, e)
         return ResponseModel(
             status="error",
             message=str(e)
@@ -177,4 +647,7 @@ def identidade():
     return ResponseModel(
         status="success",
         data={"servidor": porta}
-    ) 
\ No newline at end of file
+    )
+
+# Fim do import do módulo; o restante do startup é medido no lifespan
+startup_report.imports_finished()
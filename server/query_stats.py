@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+EXPLAIN_PREFIX = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN "
+}
+
+
+class QueryStats:
+    """Tempo por statement via eventos de cursor do SQLAlchemy.
+
+    Statements acima de `slow_ms` ficam guardados com os parâmetros; o plano
+    (EXPLAIN) é obtido só quando as estatísticas são consultadas, numa conexão
+    à parte, para não pesar no caminho das requisições.
+    """
+
+    def __init__(self, slow_ms: float = 100.0, max_statements: int = 200, max_slow: int = 50):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.statements: Dict[str, List[float]] = {}  # statement -> [execuções, total_s, max_s]
+        self.slow = deque(maxlen=max_slow)
+        self.lock = threading.Lock()
+
+    def attach(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _error(self, context):
+        # Sem o after_cursor_execute, o início da execução que falhou ficaria na pilha da conexão
+        conn = context.connection
+        if conn is not None and context.execution_context is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        if statement.startswith("EXPLAIN"):
+            return
+        with self.lock:
+            entry = self.statements.get(statement)
+            if entry is None:
+                # Acima do limite, os novos statements somam num balde só; o log de lentos mantém o SQL
+                bucket = "(outros)" if len(self.statements) >= self.max_statements else statement
+                entry = self.statements.setdefault(bucket, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+        if elapsed * 1000 >= self.slow_ms and not executemany:
+            self.slow.append({
+                "statement": statement,
+                "parameters": parameters,
+                "duration_ms": elapsed * 1000,
+                "at": datetime.now().isoformat(),
+                "plan": None
+            })
+
+    def explain_pending(self, engine: Engine):
+        """Completa o plano dos statements lentos que ainda não têm um"""
+        prefix = EXPLAIN_PREFIX.get(engine.dialect.name)
+        if prefix is None:
+            return
+        pending = [s for s in list(self.slow) if s["plan"] is None]
+        if not pending:
+            return
+        with engine.connect() as conn:
+            for entry in pending:
+                try:
+                    rows = conn.exec_driver_sql(prefix + entry["statement"], entry["parameters"]).fetchall()
+                    entry["plan"] = [" ".join(str(column) for column in row) for row in rows]
+                except Exception as e:
+                    entry["plan"] = [f"EXPLAIN falhou: {e}"]
+                    conn.rollback()
+
+    def snapshot(self, top: int = 20) -> dict:
+        with self.lock:
+            ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return {
+            "slow_ms": self.slow_ms,
+            "top_statements": [
+                {
+                    "statement": statement,
+                    "calls": calls,
+                    "total_ms": total * 1000,
+                    "avg_ms": total / calls * 1000,
+                    "max_ms": worst * 1000
+                }
+                for statement, (calls, total, worst) in ranked
+            ],
+            "slow_statements": [
+                {k: v for k, v in entry.items() if k != "parameters"} for entry in list(self.slow)
+            ]
+        }
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos: "Café" e "cafe" caem no mesmo termo"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def terms_of(nome: str) -> List[str]:
+    words = normalize(nome).split()
+    # Cada palavra e o nome inteiro: "cad" acha "Cadeira gamer" e "gam" também
+    return sorted(set(words) | {" ".join(words)}) if words else []
+
+
+class PrefixIndex:
+    """Índice em memória para autocompletar nomes de itens.
+
+    Uma lista ordenada de (termo, id) atendida por busca binária. Escritas deste
+    servidor entram na hora (upsert/remove); as do outro servidor chegam na
+    reconstrução periódica, feita numa thread a partir de `loader`. Escritas que
+    acontecem durante a reconstrução são reaplicadas sobre o índice novo.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[int, str]]], refresh_interval: float = 60.0):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.keys: List[Tuple[str, int]] = []
+        self.names: Dict[int, str] = {}
+        self.ready = False
+        self.built_at: Optional[float] = None
+        self.build_ms = 0.0
+        self.pending: Optional[List[Tuple[int, Optional[str]]]] = None  # escritas durante a reconstrução
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def _upsert(self, keys: List[Tuple[str, int]], names: Dict[int, str], item_id: int, nome: Optional[str]):
+        previous = names.pop(item_id, None)
+        if previous is not None:
+            for term in terms_of(previous):
+                index = bisect_left(keys, (term, item_id))
+                if index < len(keys) and keys[index] == (term, item_id):
+                    del keys[index]
+        if nome is not None:
+            names[item_id] = nome
+            for term in terms_of(nome):
+                insort(keys, (term, item_id))
+
+    def upsert(self, item_id: int, nome: Optional[str]):
+        """Inclui ou atualiza um item; nome None remove"""
+        with self.lock:
+            self._upsert(self.keys, self.names, item_id, nome)
+            if self.pending is not None:
+                self.pending.append((item_id, nome))
+
+    def remove(self, item_id: int):
+        self.upsert(item_id, None)
+
+    def rebuild(self):
+        started = time.perf_counter()
+        with self.lock:
+            self.pending = []
+        try:
+            names = dict(self.loader())
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+        keys = sorted((term, item_id) for item_id, nome in names.items() for term in terms_of(nome))
+        with self.lock:
+            for item_id, nome in self.pending:
+                self._upsert(keys, names, item_id, nome)
+            self.keys, self.names, self.pending = keys, names, None
+            self.ready = True
+            self.built_at = time.time()
+            self.build_ms = (time.perf_counter() - started) * 1000
+
+    def search(self, prefix: str, limit: int = 10) -> List[dict]:
+        prefix = " ".join(normalize(prefix).split())
+        results: List[dict] = []
+        if not prefix:
+            return results
+        seen = set()
+        with self.lock:
+            index = bisect_left(self.keys, (prefix, -1))
+            while index < len(self.keys) and len(results) < limit:
+                term, item_id = self.keys[index]
+                if not term.startswith(prefix):
+                    break
+                if item_id not in seen:
+                    seen.add(item_id)
+                    results.append({"id": item_id, "nome": self.names[item_id]})
+                index += 1
+        return results
+
+    def start(self):
+        """Primeira carga e reconstruções periódicas numa thread"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="autocomplete-index", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error("Erro ao reconstruir o índice de autocompletar: %s", e)
+            time.sleep(self.refresh_interval)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "ready": self.ready,
+                "items": len(self.names),
+                "terms": len(self.keys),
+                "built_at": self.built_at,
+                "build_ms": round(self.build_ms, 1)
+            }
@@ -0,0 +1,195 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Optional
+
+# Atributos padrão de LogRecord; o que sobrar veio de extra={...} e vai para o JSON
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "color_message"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em extra={...}"""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Enfileira o registro sem formatar; com a fila cheia descarta e conta"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A formatação (getMessage, json, traceback) fica para a thread de escrita
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchWriter(threading.Thread):
+    """Consome a fila e grava os registros em lotes, com um flush por lote"""
+
+    def __init__(self, handler: BoundedQueueHandler, formatter: logging.Formatter, stream, batch_size: int):
+        super().__init__(name="log-writer", daemon=True)
+        self.handler = handler
+        self.formatter = formatter
+        self.stream = stream
+        self.batch_size = batch_size
+        self.written = 0
+        self.stopping = False
+
+    def run(self):
+        while not self.stopping:
+            try:
+                batch = [self.handler.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            self.write(batch)
+
+    def write(self, batch: list):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.handler.queue.get_nowait())
+            except queue.Empty:
+                break
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                self.handler.dropped += 1
+        if lines:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+                self.written += len(lines)
+            except Exception:
+                self.handler.dropped += len(lines)
+
+    def stop(self, timeout: float = 2.0):
+        self.stopping = True
+        self.join(timeout)
+        deadline = time.monotonic() + timeout
+        while not self.handler.queue.empty() and time.monotonic() < deadline:
+            self.write([])
+
+
+class SampledLogger:
+    """Logs por requisição: só uma fração `rate` chega ao logger (e à fila)"""
+
+    def __init__(self, logger: logging.Logger, rate: float):
+        self.logger = logger
+        self.rate = rate
+
+    def _sampled(self, level: int) -> bool:
+        return (self.rate >= 1.0 or random.random() < self.rate) and self.logger.isEnabledFor(level)
+
+    def debug(self, msg, *args, **kwargs):
+        if self._sampled(logging.DEBUG):
+            self.logger.debug(msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        if self._sampled(logging.INFO):
+            self.logger.info(msg, *args, **kwargs)
+
+
+class SamplingFilter(logging.Filter):
+    """Amostra registros de um logger de terceiros (ex.: uvicorn.access)"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.INFO or self.rate >= 1.0 or random.random() < self.rate
+
+
+_handler: Optional[BoundedQueueHandler] = None
+_writer: Optional[BatchWriter] = None
+
+
+def configure_logging(service: str) -> BoundedQueueHandler:
+    """Troca o basicConfig: logs estruturados, enfileirados e gravados numa thread.
+
+    LOG_LEVEL, LOG_FORMAT (json | text), LOG_QUEUE_SIZE, LOG_BATCH_SIZE e
+    LOG_REQUEST_SAMPLE_RATE (aplicado também ao uvicorn.access).
+    """
+    global _handler, _writer
+    if _handler is not None:
+        return _handler
+
+    if os.getenv("LOG_FORMAT", "json") == "json":
+        formatter = JSONFormatter(service)
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    _handler = BoundedQueueHandler(int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _writer = BatchWriter(_handler, formatter, sys.stderr, int(os.getenv("LOG_BATCH_SIZE", "256")))
+    _writer.start()
+    atexit.register(_writer.stop)
+
+    # Otimizações documentadas do logging: sem busca de arquivo/linha e sem nome de thread por registro
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    # Logs do uvicorn passam pela mesma fila; o de acesso (um por requisição) é amostrado
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").addFilter(SamplingFilter(request_sample_rate()))
+    # O httpx registra cada requisição em INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return _handler
+
+
+def request_sample_rate() -> float:
+    return float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "0.1"))
+
+
+def request_logger(name: str) -> SampledLogger:
+    return SampledLogger(logging.getLogger(name), request_sample_rate())
+
+
+def logging_stats() -> dict:
+    if _handler is None:
+        return {}
+    return {
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "written": _writer.written if _writer else 0
+    }
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Devolvido nas escritas: até quando (epoch em ms) as leituras do cliente vão ao primário.
+# Reenviado pelo cliente, vale em qualquer servidor atrás do load balancer.
+READ_YOUR_WRITES = "X-Read-Your-Writes"
+
+# Atraso de replay em segundos; 0 quando a réplica já aplicou tudo o que recebeu
+# (sem escritas no primário, now() - último replay cresceria sem haver atraso real)
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: Engine
+    sessions: sessionmaker
+    lag_s: float = 0.0
+    healthy: bool = True
+    error: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.label,
+            "healthy": self.healthy,
+            "lag_s": round(self.lag_s, 3),
+            "error": self.error
+        }
+
+
+class ReadRouter:
+    """Escolhe o pool de cada leitura: réplicas em rodízio, primário como reserva.
+
+    Depois de uma escrita, as leituras do mesmo cliente vão ao primário durante
+    `window_s` segundos (pelo cabeçalho X-Read-Your-Writes ou, sem ele, pela
+    identidade do cliente neste processo). Uma thread mede o atraso de cada
+    réplica e tira de rodízio as que passam de `max_lag_s`.
+    """
+
+    def __init__(self, primary: sessionmaker, replica_urls: List[str], max_lag_s: float = 5.0,
+                 check_interval: float = 5.0, window_s: float = 5.0, max_clients: int = 10000,
+                 pool_size: int = 5):
+        self.primary = primary
+        self.replicas = [
+            Replica(url, engine, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+            for url, engine in (
+                (url, create_engine(url, pool_size=pool_size, pool_pre_ping=True)) for url in replica_urls
+            )
+        ]
+        self.max_lag_s = max_lag_s
+        self.check_interval = check_interval
+        self.window_s = window_s
+        self.max_clients = max_clients
+        self.recent_writers: "OrderedDict[str, float]" = OrderedDict()  # cliente -> fim da janela (monotonic)
+        self.counter = 0
+        self.reads = {"replica": 0, "primary_after_write": 0, "primary_fallback": 0}
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def client_key(authorization: Optional[str], host: Optional[str]) -> str:
+        # O token identifica o cliente mesmo atrás do gateway; sem ele, o IP
+        if authorization:
+            return hashlib.sha1(authorization.encode()).hexdigest()
+        return host or "anonimo"
+
+    def record_write(self, client: str) -> str:
+        """Abre a janela de leitura no primário; retorna o valor do cabeçalho"""
+        with self.lock:
+            self.recent_writers[client] = time.monotonic() + self.window_s
+            self.recent_writers.move_to_end(client)
+            while len(self.recent_writers) > self.max_clients:
+                self.recent_writers.popitem(last=False)
+        return str(int((time.time() + self.window_s) * 1000))
+
+    def _wrote_recently(self, client: str, read_after: Optional[str]) -> bool:
+        if read_after:
+            try:
+                deadline = int(read_after)
+            except ValueError:
+                deadline = 0
+            now_ms = time.time() * 1000
+            # Prazo além de uma janela não saiu de um servidor: é ignorado, senão um
+            # cliente prenderia as próprias leituras no primário indefinidamente
+            if now_ms < deadline <= now_ms + self.window_s * 1000:
+                return True
+        with self.lock:
+            until = self.recent_writers.get(client)
+            if until is None:
+                return False
+            if until > time.monotonic():
+                return True
+            del self.recent_writers[client]
+            return False
+
+    def read_sessions(self, client: str, read_after: Optional[str] = None) -> sessionmaker:
+        if not self.replicas:
+            return self.primary
+        self._ensure_checker()
+        if self._wrote_recently(client, read_after):
+            with self.lock:
+                self.reads["primary_after_write"] += 1
+            return self.primary
+        with self.lock:
+            available = [r for r in self.replicas if r.healthy]
+            if not available:
+                self.reads["primary_fallback"] += 1
+                return self.primary
+            self.counter += 1
+            self.reads["replica"] += 1
+            return available[self.counter % len(available)].sessions
+
+    def check(self):
+        """Mede o atraso de cada réplica uma vez"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    lag = float(conn.execute(text(LAG_QUERY)).scalar() or 0) if replica.engine.dialect.name == "postgresql" else 0.0
+                healthy, error = lag <= self.max_lag_s, None
+            except Exception as e:
+                lag, healthy, error = replica.lag_s, False, str(e)
+            if healthy != replica.healthy:
+                if healthy:
+                    logger.info("Réplica %s de volta ao rodízio (atraso %.1fs)", replica.label, lag)
+                else:
+                    logger.warning("Réplica %s fora do rodízio (atraso %.1fs, erro: %s)", replica.label, lag, error)
+            replica.lag_s, replica.healthy, replica.error = lag, healthy, error
+
+    def _ensure_checker(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while True:
+            self.check()
+            time.sleep(self.check_interval)
+
+    def stats(self) -> dict:
+        with self.lock:
+            reads = dict(self.reads)
+        return {
+            "replicas": [r.to_dict() for r in self.replicas],
+            "max_lag_s": self.max_lag_s,
+            "read_your_writes_window_s": self.window_s,
+            "reads": reads
+        }
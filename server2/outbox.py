@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Um drenador por vez entre todos os servidores (PostgreSQL); a sequência fica sem buracos
+DRAIN_LOCK_ID = 7261002
+
+PENDING = text("SELECT id, item_id, operacao, versao FROM item_eventos WHERE sequencia IS NULL ORDER BY id LIMIT :limite")
+LAST_SEQUENCE = text("SELECT COALESCE(MAX(sequencia), 0) FROM item_eventos")
+MARK_PUBLISHED = text(
+    "UPDATE item_eventos SET sequencia = :sequencia, publicado_em = :agora WHERE id = :id"
+)
+SINCE = text(
+    "SELECT sequencia, item_id, operacao, versao, criado_em FROM item_eventos "
+    "WHERE sequencia > :apos ORDER BY sequencia LIMIT :limite"
+)
+PURGE = text("DELETE FROM item_eventos WHERE sequencia IS NOT NULL AND publicado_em < :limite")
+
+
+class RedisStreamPublisher:
+    """Publica os eventos num Redis Stream (XADD), com tamanho aproximado limitado"""
+
+    def __init__(self, url: str, stream: str = "itens:eventos", maxlen: int = 100000):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def publish(self, events: List[dict]):
+        pipe = self.client.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(self.stream, {k: str(v) for k, v in event.items()}, maxlen=self.maxlen, approximate=True)
+        pipe.execute()
+
+
+class OutboxDrainer:
+    """Drena a tabela item_eventos (outbox transacional) em ordem.
+
+    As escritas gravam o evento na mesma transação do item; esta thread numera
+    os pendentes (sequencia), publica no `publisher` (opcional) e marca como
+    publicados. A entrega é pelo menos uma vez: se o commit falhar depois da
+    publicação, o lote sai de novo, e o consumidor descarta por (item_id, versao).
+    """
+
+    def __init__(self, engine: Engine, publisher: Optional[RedisStreamPublisher] = None, batch_size: int = 500,
+                 interval: float = 0.5, retention_s: float = 86400.0):
+        self.engine = engine
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retention_s = retention_s
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.errors = 0
+        self.last_purge = 0.0
+
+    def notify(self):
+        """Chamado depois de um commit com evento: drena sem esperar o intervalo"""
+        self.wakeup.set()
+
+    def drain_once(self) -> int:
+        postgres = self.engine.dialect.name == "postgresql"
+        with self.engine.begin() as conn:
+            if postgres and not conn.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": DRAIN_LOCK_ID}).scalar():
+                return 0
+            rows = conn.execute(PENDING, {"limite": self.batch_size}).all()
+            if not rows:
+                return 0
+            last = conn.execute(LAST_SEQUENCE).scalar()
+            now = datetime.utcnow()
+            events = [
+                {"sequencia": last + n, "item_id": row.item_id, "operacao": row.operacao, "versao": row.versao}
+                for n, row in enumerate(rows, start=1)
+            ]
+            conn.execute(
+                MARK_PUBLISHED,
+                [{"sequencia": event["sequencia"], "agora": now, "id": row.id} for event, row in zip(events, rows)]
+            )
+            if self.publisher is not None:
+                self.publisher.publish(events)
+        self.published += len(events)
+        return len(events)
+
+    def purge(self):
+        with self.engine.begin() as conn:
+            conn.execute(PURGE, {"limite": datetime.utcnow() - timedelta(seconds=self.retention_s)})
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="outbox-drainer", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                # Lote cheio: provavelmente há mais pendentes
+                while self.drain_once() == self.batch_size:
+                    pass
+                if time.monotonic() - self.last_purge > 60:
+                    self.purge()
+                    self.last_purge = time.monotonic()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Erro ao drenar eventos de itens: %s", e)
+                time.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "errors": self.errors,
+            "publisher": "redis" if self.publisher is not None else None
+        }
+
+
+def events_since(engine: Engine, after: int, limit: int) -> List[dict]:
+    """Eventos já numerados depois de `after`, em ordem de sequência"""
+    with engine.connect() as conn:
+        rows = conn.execute(SINCE, {"apos": after, "limite": limit}).all()
+    return [
+        {
+            "sequencia": row.sequencia,
+            "item_id": row.item_id,
+            "operacao": row.operacao,
+            "versao": row.versao,
+            "criado_em": row.criado_em.isoformat() if isinstance(row.criado_em, datetime) else row.criado_em
+        }
+        for row in rows
+    ]
@@ -0,0 +1,84 @@
+"""Relatório de inicialização do serviço.
+
+Importado antes de tudo no main.py, que chama imports_finished() na última
+linha: o relatório tem o tempo de import do main.py, o de cada bloco de imports
+marcado com timed_import() (FastAPI, dependências pesadas, módulos do serviço)
+e, depois, a duração de cada etapa do lifespan. Sai no log quando o serviço
+fica pronto e na resposta de /pronto. Cada bloco conta só os módulos que ainda
+não estavam carregados; o detalhe de todo o grafo de imports fica com o próprio
+Python: `python -X importtime -c "import main"`.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+def _process_age() -> Optional[float]:
+    # Segundos desde o início do processo (Linux); inclui o interpretador e o uvicorn
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.process_age_at_start = _process_age()
+        self.imports: Dict[str, float] = {}
+        self.imports_done: Optional[float] = None
+        self.phases: List[dict] = []
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def timed_import(self, name: str):
+        """Mede um bloco de imports do main.py"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports[name] = self.imports.get(name, 0.0) + time.perf_counter() - start
+
+    def imports_finished(self):
+        """Chamado no fim do main.py"""
+        self.imports_done = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    def mark_ready(self):
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def to_dict(self) -> dict:
+        slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "process_start_to_main_ms": round(self.process_age_at_start * 1000, 1) if self.process_age_at_start is not None else None,
+            "main_import_ms": round((self.imports_done - self.started) * 1000, 1) if self.imports_done else None,
+            "slowest_imports": [{"module": name, "ms": round(seconds * 1000, 1)} for name, seconds in slowest],
+            "phases": self.phases,
+            "ready_ms": round((self.ready_at - self.started) * 1000, 1) if self.ready_at else None
+        }
+
+
+def readiness(checks: Dict[str, bool]) -> Tuple[int, dict]:
+    """Status HTTP e corpo de /pronto: 200 só com todas as verificações ok"""
+    ready = all(checks.values())
+    return (200 if ready else 503), {"ready": ready, "checks": checks, "startup": startup_report.to_dict()}
+
+
+startup_report = StartupReport()
@@ -0,0 +1,22 @@
+from typing import Optional, Sequence
+
+import jwt
+
+
+class TokenVerifier:
+    """Valida localmente os JWT emitidos pelo gateway com as chaves públicas do JWKS (em cache)"""
+
+    def __init__(self, jwks_url: str, cache_ttl: int = 300, algorithms: Sequence[str] = ("RS256", "EdDSA")):
+        self.client = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=cache_ttl, timeout=5)
+        self.algorithms = list(algorithms)
+
+    def verify(self, token: str) -> dict:
+        """Retorna o payload; levanta jwt.PyJWTError se o token for inválido ou o kid desconhecido"""
+        signing_key = self.client.get_signing_key_from_jwt(token)
+        return jwt.decode(token, signing_key.key, algorithms=self.algorithms)
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return authorization.split(" ", 1)[1]
@@ -0,0 +1,246 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, MutableMapping, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+
+
+@dataclass
+class Span:
+    name: str
+    service: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    sampled: bool
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, object] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "attributes": self.attributes
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: Optional[str]):
+    """Lê um cabeçalho W3C traceparent; retorna (trace_id, parent_id, sampled) ou None"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 0x01)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class HTTPExporter:
+    """Envia lotes de spans ao serviço de monitoramento (POST JSON)"""
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        body = json.dumps({"spans": [s.to_dict() for s in spans]}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+
+class OTLPFileExporter:
+    """Grava lotes de spans como linhas JSON no formato OTLP/JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        by_service: Dict[str, List[dict]] = {}
+        for s in spans:
+            by_service.setdefault(s.service, []).append({
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [
+                    {"key": k, "value": {"stringValue": str(v)}} for k, v in s.attributes.items()
+                ]
+            })
+        line = json.dumps({
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                    "scopeSpans": [{"scope": {"name": "arquitetura.tracing"}, "spans": items}]
+                }
+                for service, items in by_service.items()
+            ]
+        })
+        with open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    """Spans em processo com propagação W3C e exportação em lotes numa thread.
+
+    A amostragem é decidida na raiz (TRACE_SAMPLE_RATE) e herdada pelos
+    serviços seguintes via flag do traceparent; requisições não amostradas só
+    propagam os ids, sem registrar spans.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        sample_rate: float = 0.01,
+        exporters: Optional[list] = None,
+        batch_size: int = 512,
+        interval: float = 2.0,
+        max_queue: int = 10000
+    ):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.exporters = exporters or []
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue: deque = deque(maxlen=max_queue)
+        self.dropped = 0
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def request_span(self, name: str, traceparent: Optional[str] = None):
+        """Span raiz do serviço, continuando o trace recebido (se houver)"""
+        parent = parse_traceparent(traceparent)
+        if parent:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = _new_id(16), None
+            sampled = random.random() < self.sample_rate
+        span = Span(name, self.service, trace_id, _new_id(8), parent_id, sampled)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Span filho do span atual; sem custo além do contextvar se o trace não for amostrado"""
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            yield parent
+            return
+        span = Span(name, self.service, parent.trace_id, _new_id(8), parent.span_id, True, attributes=attributes)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span):
+        token = _current_span.set(span)
+        if span.sampled:
+            span.start_ns = time.time_ns()
+        try:
+            yield span
+        except Exception as e:
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            if span.sampled:
+                span.end_ns = time.time_ns()
+                self._record(span)
+
+    def inject(self, headers: MutableMapping[str, str]) -> MutableMapping[str, str]:
+        """Adiciona o traceparent do span atual aos cabeçalhos de saída"""
+        span = _current_span.get()
+        if span is not None:
+            headers[TRACEPARENT] = span.traceparent()
+        return headers
+
+    def _record(self, span: Span):
+        if not self.exporters:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(span)
+        self._ensure_thread()
+        if len(self.queue) >= self.batch_size:
+            self.wakeup.set()
+
+    def _ensure_thread(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        while self.queue:
+            batch = []
+            while self.queue and len(batch) < self.batch_size:
+                batch.append(self.queue.popleft())
+            for exporter in self.exporters:
+                try:
+                    exporter.export(batch)
+                except Exception as e:
+                    logger.warning("Falha ao exportar %s spans: %s", len(batch), e)
+
+
+def tracer_from_env(service: str) -> Tracer:
+    exporters = []
+    if os.getenv("TRACE_EXPORT_URL"):
+        exporters.append(HTTPExporter(os.getenv("TRACE_EXPORT_URL")))
+    if os.getenv("TRACE_EXPORT_FILE"):
+        exporters.append(OTLPFileExporter(os.getenv("TRACE_EXPORT_FILE")))
+    return Tracer(
+        service,
+        sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")),
+        exporters=exporters,
+        batch_size=int(os.getenv("TRACE_BATCH_SIZE", "512")),
+        interval=float(os.getenv("TRACE_EXPORT_INTERVAL", "2")),
+        max_queue=int(os.getenv("TRACE_MAX_QUEUE", "10000"))
+    )
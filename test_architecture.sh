@@ -24,7 +24,7 @@ wait_for_service() {
     echo "⏳ Aguardando $service_name ficar disponível..."
     
     while [ $attempt -le $max_attempts ]; do
-        if curl -s "$url/saude" > /dev/null 2>&1; then
+        if curl -sf "$url/pronto" > /dev/null 2>&1; then
             echo "✅ $service_name está disponível!"
             return 0
         fi
@@ -91,6 +91,7 @@ cd server
 source venv/bin/activate
 export DATABASE_URL="postgresql://sued@localhost:5432/arquitetura"
 export PORTA=8002
+export AUTO_MIGRATE=true  # cria/atualiza o schema antes de atender
 uvicorn main:app --host 0.0.0.0 --port 8002 &
 SERVER1_PID=$!
 cd ..
@@ -0,0 +1,11 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cada serviço importa os próprios módulos pelo nome (como no container); os nomes
+# testados aqui não se repetem entre os diretórios. server2 é cópia de server.
+for service in ("api_gateway", "load_balancer", "server", "monitoring"):
+    path = str(ROOT / service)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,32 @@
+import time
+
+from db_routing import ReadRouter
+
+PRIMARY = object()
+
+
+def router(window_s=5.0):
+    return ReadRouter(PRIMARY, [], window_s=window_s)
+
+
+def test_cabecalho_emitido_vale_em_outro_servidor():
+    header = router().record_write("a")
+    assert router()._wrote_recently("b", header)
+
+
+def test_cabecalho_vencido_ou_invalido():
+    assert not router()._wrote_recently("a", str(int(time.time() * 1000) - 1))
+    assert not router()._wrote_recently("a", "amanha")
+
+
+def test_prazo_alem_da_janela_e_ignorado():
+    far_future = str(int((time.time() + 3600) * 1000))
+    assert not router()._wrote_recently("a", far_future)
+
+
+def test_janela_local_sem_cabecalho():
+    r = router(window_s=0.05)
+    r.record_write("a")
+    assert r._wrote_recently("a", None)
+    time.sleep(0.06)
+    assert not r._wrote_recently("a", None)
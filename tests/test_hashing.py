@@ -0,0 +1,40 @@
+from hashing import ConsistentHashRing, routing_key
+from registry import Backend
+
+
+def backends(*urls):
+    return [Backend(url=url) for url in urls]
+
+
+def test_mesma_chave_mesmo_servidor():
+    ring = ConsistentHashRing()
+    pool = backends("http://a", "http://b", "http://c")
+    assert len({ring.select("itens/42", pool).url for _ in range(10)}) == 1
+
+
+def test_remover_servidor_so_remapeia_as_chaves_dele():
+    ring = ConsistentHashRing()
+    pool = backends("http://a", "http://b", "http://c")
+    keys = [f"itens/{i}" for i in range(500)]
+    before = {k: ring.select(k, pool).url for k in keys}
+    after = {k: ring.select(k, pool[:2]).url for k in keys}
+    moved = [k for k in keys if before[k] != after[k]]
+    assert moved and all(before[k] == "http://c" for k in moved)
+
+
+def test_carga_limitada_desvia_do_servidor_cheio():
+    ring = ConsistentHashRing(load_factor=1.0)
+    pool = backends("http://a", "http://b")
+    owner = ring.select("itens/1", pool)
+    owner.inflight = 10
+    assert ring.select("itens/1", pool).url != owner.url
+
+
+def test_sem_servidores():
+    assert ConsistentHashRing().select("itens/1", []) is None
+
+
+def test_routing_key():
+    assert routing_key("path", "/itens/42", {}) == "itens/42"
+    assert routing_key("path", "/itens", {}) is None
+    assert routing_key("header:x-tenant", "/itens", {"x-tenant": "t1"}) == "t1"
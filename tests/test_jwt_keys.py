@@ -0,0 +1,49 @@
+import threading
+
+import jwt
+import pytest
+
+from jwt_keys import KeyRing
+
+
+def ring(keys_dir, **kwargs):
+    return KeyRing(algorithm="EdDSA", keys_dir=str(keys_dir), **kwargs)
+
+
+def test_kid_novo_de_outro_worker_vale_na_hora(tmp_path):
+    a, b = ring(tmp_path), ring(tmp_path)
+    a.rotate_if_due()
+    b.rotate_if_due()
+    assert a.current().kid == b.current().kid
+    a.rotation_interval = 0
+    a.rotate_if_due()
+    token = a.sign({"sub": "ana"})
+    assert b.verify(token)["sub"] == "ana"
+
+
+def test_kid_inventado_rejeitado(tmp_path):
+    a = ring(tmp_path)
+    a.rotate_if_due()
+    forged = jwt.encode({"sub": "ana"}, "x", algorithm="HS256", headers={"kid": "inexistente"})
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidTokenError):
+            a.verify(forged)
+
+
+def test_workers_simultaneos_geram_uma_so_chave(tmp_path):
+    rings = [ring(tmp_path) for _ in range(4)]
+    threads = [threading.Thread(target=r.rotate_if_due) for r in rings]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(list(tmp_path.glob("*.pem"))) == 1
+    assert len({r.current().kid for r in rings}) == 1
+
+
+def test_arquivo_invalido_ignorado(tmp_path):
+    (tmp_path / "backup-antigo.pem").write_text("lixo")
+    (tmp_path / "123-abc.pem").write_text("lixo")
+    a = ring(tmp_path)
+    a.rotate_if_due()
+    assert a.verify(a.sign({"sub": "ana"}))["sub"] == "ana"
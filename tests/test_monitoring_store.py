@@ -0,0 +1,35 @@
+import pytest
+
+from store import MemoryMonitoringStore, MonitoringStore, SQLiteMonitoringStore
+
+
+def test_interface_abstrata():
+    with pytest.raises(TypeError):
+        MonitoringStore()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def monitoring_store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryMonitoringStore(metric_retention=2, trace_retention=2)
+    store = SQLiteMonitoringStore(str(tmp_path / "monitor.db"), metric_retention=2, trace_retention=2)
+    store.setup()
+    return store
+
+
+def test_metricas_retidas_e_contadores(monitoring_store):
+    for status_code in (200, 500, 200):
+        monitoring_store.add_metric({"service": "server", "endpoint": "/itens", "status_code": status_code})
+    assert [m["status_code"] for m in monitoring_store.metrics()] == [500, 200]
+    assert monitoring_store.counts() == {"server:/itens": {"requests": 3, "errors": 1}}
+
+
+def test_traces_mais_recentes_primeiro(monitoring_store):
+    monitoring_store.add_spans([{"trace_id": "a", "name": "1"}])
+    monitoring_store.add_spans([{"trace_id": "b", "name": "1"}])
+    monitoring_store.add_spans([{"trace_id": "a", "name": "2"}])
+    assert [trace_id for trace_id, _ in monitoring_store.traces()] == ["a", "b"]
+    monitoring_store.add_spans([{"trace_id": "c", "name": "1"}])
+    assert [trace_id for trace_id, _ in monitoring_store.traces()] == ["c", "a"]
+    assert [span["name"] for span in monitoring_store.trace("a")] == ["1", "2"]
+    assert monitoring_store.trace_count() == 2
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from query_stats import QueryStats
+
+
+@pytest.fixture
+def engine():
+    return create_engine("sqlite://")
+
+
+def test_agrupa_por_statement(engine):
+    stats = QueryStats(slow_ms=10_000)
+    stats.attach(engine)
+    with engine.connect() as conn:
+        for _ in range(3):
+            conn.execute(text("SELECT 1"))
+    top = stats.snapshot()["top_statements"]
+    assert [(s["statement"], s["calls"]) for s in top] == [("SELECT 1", 3)]
+    assert stats.snapshot()["slow_statements"] == []
+
+
+def test_acima_do_limite_agrega_em_outros_mas_mantem_sql_dos_lentos(engine):
+    stats = QueryStats(slow_ms=0, max_statements=1)
+    stats.attach(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    snapshot = stats.snapshot()
+    assert {s["statement"] for s in snapshot["top_statements"]} == {"SELECT 1", "(outros)"}
+    assert [s["statement"] for s in snapshot["slow_statements"]] == ["SELECT 1", "SELECT 2"]
+
+
+def test_explain_dos_lentos(engine):
+    stats = QueryStats(slow_ms=0)
+    stats.attach(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    stats.explain_pending(engine)
+    plan = stats.snapshot()["slow_statements"][0]["plan"]
+    assert plan and not plan[0].startswith("EXPLAIN falhou")
+
+
+def test_erro_nao_deixa_inicio_na_conexao(engine):
+    stats = QueryStats()
+    stats.attach(engine)
+    with engine.connect() as conn:
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM tabela_inexistente"))
+        assert conn.info.get("query_start") == []
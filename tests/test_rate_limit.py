@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from rate_limit import MemoryBucketStore, RateLimiter, parse_limits
+
+
+def take(store, key, rate, capacity):
+    return asyncio.run(store.take(key, rate, capacity))
+
+
+def test_parse_limits():
+    assert parse_limits("/itens=20:40,*=5") == {"/itens": (20.0, 40.0), "*": (5.0, 5.0)}
+
+
+def test_rajada_ate_a_capacidade():
+    store = MemoryBucketStore()
+    results = [take(store, "u|/itens", 1.0, 3)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    allowed, wait = take(store, "u|/itens", 1.0, 3)
+    assert not allowed and 0 < wait <= 1.0
+
+
+def test_buckets_independentes_por_chave():
+    store = MemoryBucketStore()
+    take(store, "a", 1.0, 1)
+    assert take(store, "b", 1.0, 1)[0]
+
+
+def test_limite_pelo_prefixo_mais_longo():
+    limiter = RateLimiter(parse_limits("/itens=1:1,/itens/busca=100:100,*=10:10"), MemoryBucketStore())
+    assert limiter.limit_for("/itens/busca")[0] == "/itens/busca"
+    assert limiter.limit_for("/itens/42")[0] == "/itens"
+    assert limiter.limit_for("/login")[0] == "*"
+
+
+def test_buckets_limitados_em_ordem_lru():
+    store = MemoryBucketStore(max_buckets=2)
+    for key in ("a", "b", "c"):
+        take(store, key, 0.001, 5)
+    assert list(store.buckets) == ["b", "c"]
+    take(store, "b", 0.001, 5)
+    take(store, "d", 0.001, 5)
+    assert list(store.buckets) == ["b", "d"]
+
+
+def test_bucket_que_ja_estaria_cheio_e_descartado():
+    store = MemoryBucketStore()
+    take(store, "rapido", 1000.0, 1)  # volta a encher em 1 ms
+    take(store, "lento", 0.001, 5)
+    time.sleep(0.01)
+    take(store, "outro", 0.001, 5)
+    assert "rapido" not in store.buckets
+    assert "lento" in store.buckets
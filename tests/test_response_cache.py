@@ -0,0 +1,68 @@
+from response_cache import ResponseCache, is_success, parse_routes
+from upstream import forward_headers, response_headers
+
+
+def test_parse_routes():
+    routes = parse_routes("/itens=5, /itens/{id}=30,invalida")
+    assert [(p.pattern, ttl) for p, ttl in routes] == [("^/itens$", 5.0), ("^/itens/[^/]+$", 30.0)]
+
+
+def test_ttl_da_primeira_rota_que_casa():
+    cache = ResponseCache("/itens/busca=5,/itens/eventos=0,/itens/{id}=30")
+    assert cache.ttl_for("/itens/busca") == 5
+    assert cache.ttl_for("/itens/eventos") is None
+    assert cache.ttl_for("/itens/42") == 30
+    assert cache.ttl_for("/outra") is None
+
+
+def store(cache, path, query=""):
+    key = cache.key(path, query)
+    cache.set(key, path, b"{}", 200, {}, 30)
+    return key
+
+
+def test_invalidate_remove_recurso_colecao_e_subrecursos():
+    cache = ResponseCache("/itens=5,/itens/{id}=30")
+    item = store(cache, "/itens/1")
+    colecao = store(cache, "/itens", "limite=10")
+    sub = store(cache, "/itens/1/historico")
+    outro = store(cache, "/itens/2")
+    assert cache.invalidate("/itens/1") == 3
+    assert cache.get(item) is None and cache.get(colecao) is None and cache.get(sub) is None
+    assert cache.get(outro) is not None
+
+
+def test_lru_respeita_max_entries():
+    cache = ResponseCache("/itens/{id}=30", max_entries=2)
+    first = store(cache, "/itens/1")
+    store(cache, "/itens/2")
+    store(cache, "/itens/3")
+    assert cache.get(first) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_so_envelope_de_sucesso_e_cacheavel():
+    assert is_success(b'{"status":"success","data":[]}')
+    assert is_success(b'{ "data": [], "status": "success" }')
+    assert not is_success(b'{"status":"error","message":"Item n\xc3\xa3o encontrado"}')
+    assert not is_success(b'[]')
+    assert not is_success(b'<html>')
+
+
+def test_cabecalhos_do_corpo_descomprimido_nao_voltam():
+    headers = response_headers({
+        "content-type": "application/json",
+        "content-encoding": "gzip",
+        "content-length": "31",
+        "transfer-encoding": "chunked",
+        "connection": "keep-alive, x-interno",
+        "x-interno": "1"
+    }, decoded=True)
+    assert headers == {"content-type": "application/json"}
+    entry = ResponseCache("/itens=5").set("k", "/itens", b"{}", 200, headers, 5)
+    assert entry.headers == {"content-type": "application/json"}
+
+
+def test_cabecalhos_encaminhados_sem_hop_by_hop():
+    headers = forward_headers({"host": "gateway", "content-length": "2", "connection": "close", "x-id": "1"}, "10.0.0.1")
+    assert headers == {"x-id": "1", "x-forwarded-for": "10.0.0.1"}
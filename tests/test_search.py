@@ -0,0 +1,49 @@
+from search import PrefixIndex, normalize
+
+
+def index_with(items):
+    index = PrefixIndex(lambda: list(items.items()))
+    index.rebuild()
+    return index
+
+
+def test_normaliza_acentos_e_caixa():
+    assert normalize("Café") == "cafe"
+
+
+def test_busca_por_prefixo_de_qualquer_palavra():
+    index = index_with({1: "Cadeira gamer", 2: "Mesa", 3: "Café especial"})
+    assert [r["id"] for r in index.search("cad")] == [1]
+    assert [r["id"] for r in index.search("gam")] == [1]
+    assert [r["id"] for r in index.search("CAFE")] == [3]
+    assert index.search("") == []
+
+
+def test_um_resultado_por_item_e_limite():
+    index = index_with({i: f"item item {i}" for i in range(20)})
+    results = index.search("item", limit=5)
+    assert len(results) == 5
+    assert len({r["id"] for r in results}) == 5
+
+
+def test_upsert_e_remove():
+    index = index_with({1: "Mesa"})
+    index.upsert(1, "Cadeira")
+    assert index.search("mes") == []
+    assert index.search("cad") == [{"id": 1, "nome": "Cadeira"}]
+    index.remove(1)
+    assert index.search("cad") == []
+
+
+def test_escrita_durante_reconstrucao_nao_se_perde():
+    index = PrefixIndex(lambda: [])
+
+    def loader():
+        # Escrita que chega enquanto o loader lê o banco
+        index.upsert(7, "Lampada")
+        return [(1, "Mesa")]
+
+    index.loader = loader
+    index.rebuild()
+    assert [r["id"] for r in index.search("lam")] == [7]
+    assert [r["id"] for r in index.search("mes")] == [1]
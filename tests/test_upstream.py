@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from upstream import relay
+
+
+class Stream(httpx.AsyncByteStream):
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.closed = False
+
+    async def __aiter__(self):
+        yield b'{"id": 1}\n'
+        if self.fail:
+            raise httpx.ReadError("conexão caiu")
+        yield b'{"id": 2}\n'
+
+    async def aclose(self):
+        self.closed = True
+
+
+def consume(fail: bool):
+    stream = Stream(fail)
+    released = []
+
+    async def run():
+        response = httpx.Response(200, stream=stream)
+        return [chunk async for chunk in relay(response, lambda: released.append(True))]
+
+    return stream, released, run
+
+
+def test_relay_libera_ao_fim_do_corpo():
+    stream, released, run = consume(fail=False)
+    assert asyncio.run(run()) == [b'{"id": 1}\n', b'{"id": 2}\n']
+    assert stream.closed and released == [True]
+
+
+def test_relay_libera_quando_o_servidor_cai_no_meio():
+    stream, released, run = consume(fail=True)
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(run())
+    assert stream.closed and released == [True]
+
+
+def test_relay_aceita_on_close_assincrono():
+    released = []
+
+    async def on_close():
+        released.append(True)
+
+    async def run():
+        response = httpx.Response(200, stream=Stream(fail=False))
+        async for _ in relay(response, on_close):
+            break
+
+    asyncio.run(run())
+    assert released == [True]
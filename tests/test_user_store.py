@@ -0,0 +1,17 @@
+import pytest
+
+from user_store import CachedUserStore, MemoryUserStore, UserStore
+
+
+def test_interface_abstrata():
+    with pytest.raises(TypeError):
+        UserStore()
+
+
+def test_cached_user_store_invalida_na_escrita():
+    store = CachedUserStore(MemoryUserStore())
+    assert store.get("ana") is None
+    assert store.add({"username": "ana", "password": "h1", "role": "user"})
+    assert not store.add({"username": "ana", "password": "h2", "role": "user"})
+    store.update_password("ana", "h3")
+    assert store.get("ana")["password"] == "h3"